@@ -3,17 +3,61 @@ Application Flask principale - Upload et Scan de Livre/PDF → Résumés Vocaux
 Projet AMU Data Science avec interaction mobile et assistant IA
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, send_from_directory
+# Mode du serveur : threading par défaut (vrais threads système : appels
+# Gemini, encodage des embeddings, OCR et SQLite en parallèle). eventlet ou
+# gevent, sur demande, doivent patcher la bibliothèque standard avant tout
+# autre import (flask, socket...). Le mode se choisit avec la variable
+# d'environnement du processus SOCKETIO_ASYNC_MODE (le .env n'est pas encore
+# chargé ici). Repli sur le mode threading si le module est absent.
+import os
+SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE', 'threading')
+try:
+    if SOCKETIO_ASYNC_MODE == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    elif SOCKETIO_ASYNC_MODE == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+    else:
+        SOCKETIO_ASYNC_MODE = 'threading'
+except ImportError:
+    SOCKETIO_ASYNC_MODE = 'threading'
+
+from flask import Flask, Response, render_template, request, jsonify, send_file, send_from_directory, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
-import os
 from pathlib import Path
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import uuid
+from urllib.parse import quote
+import hashlib
+import importlib.util
 from dotenv import load_dotenv
 import google.generativeai as genai
 import socket
+import atexit
+import logging
+import logging.handlers
+import queue
+import json
+import re
+import sqlite3
+import stat
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:  # orjson optionnel : sérialisation Flask standard sinon
+    orjson = None
+
+try:
+    from flask_compress import Compress
+except ImportError:  # flask-compress optionnel : réponses non compressées sinon
+    Compress = None
 
 # Imports des modules existants
 from src.universal_document_processor import UniversalDocumentProcessor
@@ -28,10 +72,45 @@ from src.qr_code_generator import QRCodeGenerator
 from src.real_time_interaction import RealTimeInteractionManager
 from src.gemini_rag_assistant import GeminiRAGAssistant
 from src.course_indexer import CourseIndexer
+from src.response_cache import ResponseCache
+from src.semantic_cache import SemanticCache
+from src.media_index import MediaIndex
+from src.job_queue import BackgroundJobManager
+from src.db_pool import ConnectionPool, read_connection
+from src.prompt_templates import (
+    SUBJECT_PROMPT_TMPL,
+    SUMMARY_PROMPT_TMPL,
+    EXPLANATION_PROMPT_TMPL,
+    EXPLANATION_WITH_CONTEXT_PROMPT_TMPL,
+    DETAIL_INSTRUCTIONS,
+    TOPIC_PROMPT_TMPL,
+    TOPIC_WITH_CONTEXT_PROMPT_TMPL,
+    QUIZ_PROMPT_TMPL
+)
 
 # Charger les variables d'environnement
 load_dotenv()
 
+# OCR en parallèle sur plusieurs uploads : un seul thread OpenMP par
+# processus Tesseract est plus rapide que des processus multi-threadés
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+# ============================================================================
+# JOURNALISATION
+# ============================================================================
+
+# Les messages passent par une file : l'écriture sur stderr se fait dans le
+# thread du QueueListener, pas dans le thread qui traite la requête
+log_queue = queue.Queue(-1)
+log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+log_listener.start()
+atexit.register(log_listener.stop)
+
+logger = logging.getLogger('amu_app')
+logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+logger.addHandler(logging.handlers.QueueHandler(log_queue))
+logger.propagate = False
+
 # ============================================================================
 # FONCTION HELPER POUR EXTRAIRE LES RÉPONSES GEMINI
 # ============================================================================
@@ -61,15 +140,16 @@ def extract_gemini_response(response):
 # FONCTION POUR OBTENIR L'IP LOCALE
 # ============================================================================
 
+@lru_cache(maxsize=1)
 def get_local_ip():
-    """Obtient l'adresse IP locale de la machine."""
+    """Obtient l'adresse IP locale de la machine (calculée une seule fois)."""
     try:
-        # Créer une socket pour obtenir l'IP locale
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        local_ip = s.getsockname()[0]
-        s.close()
-        return local_ip
+        # Créer une socket UDP pour obtenir l'IP locale (aucun paquet n'est envoyé),
+        # avec un timeout court pour ne jamais bloquer le serveur
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.settimeout(0.2)
+            s.connect(("8.8.8.8", 80))
+            return s.getsockname()[0]
     except Exception:
         return "127.0.0.1"
 
@@ -77,94 +157,255 @@ def get_local_ip():
 # CONFIGURATION DE L'APPLICATION
 # ============================================================================
 
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Sérialise les réponses JSON avec orjson (encodeur C, accents non échappés).
+    
+    Les tableaux et scalaires NumPy (similarités, statistiques d'indexation)
+    sont sérialisés directement, sans conversion préalable en float/list.
+    """
+    
+    option = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option),
+            mimetype=self.mimetype
+        )
+
+class OrjsonSocketJSON:
+    """Module JSON passé à Socket.IO : paquets encodés une fois avec orjson."""
+    
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj, option=OrjsonProvider.option).decode()
+    
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+if orjson:
+    app.json = OrjsonProvider(app)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50 MB max file size
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['ALLOWED_EXTENSIONS'] = {'pdf', 'png', 'jpg', 'jpeg', 'txt', 'docx'}
+app.config['ALLOWED_EXTENSIONS'] = frozenset({'pdf', 'png', 'jpg', 'jpeg', 'txt', 'docx'})
+app.config['UPLOAD_CHUNK_SIZE'] = 1 << 20  # Copie des uploads par blocs de 1 MB
+app.config['LOCAL_IP'] = get_local_ip()  # Sondé une fois au démarrage
+# URL publique des liens mobiles (QR codes), surchargeable derrière un proxy
+app.config['BASE_URL'] = os.getenv('BASE_URL') or f"http://{app.config['LOCAL_IP']}:5000"
+
+# Délégation de l'envoi des fichiers au proxy frontal :
+# 'accel' (nginx, X-Accel-Redirect), 'xsendfile' (Apache mod_xsendfile) ou '' (Flask)
+app.config['SENDFILE_MODE'] = os.getenv('SENDFILE_MODE', '').lower()
+app.config['ACCEL_AUDIO_PREFIX'] = os.getenv('ACCEL_AUDIO_PREFIX', '/_protected_audio/')
+app.config['ACCEL_PDF_PREFIX'] = os.getenv('ACCEL_PDF_PREFIX', '/_internal_pdfs/')
+# Avec Apache, send_file émet X-Sendfile tout en gérant ETag / 304 côté Flask
+app.use_x_sendfile = app.config['SENDFILE_MODE'] == 'xsendfile'
+# Durée de cache navigateur des podcasts et PDF (revalidés ensuite par ETag)
+app.config['MEDIA_MAX_AGE'] = int(os.getenv('MEDIA_MAX_AGE', 3600))
+
+# Modèle Gemini et version des prompts (utilisés pour les clés du cache de réponses)
+GEMINI_MODEL_NAME = os.getenv('GEMINI_MODEL', 'models/gemini-2.5-flash')
+PROMPT_VERSION = '3'
+
+# Transport Gemini : en mode threading, un seul canal gRPC (HTTP/2) réutilisé
+# par tous les appels. grpcio ne fonctionne pas sous eventlet (appels bloqués) :
+# REST y est imposé. Sous gevent, gRPC demande init_gevent(), sinon REST.
+GEMINI_TRANSPORT = os.getenv(
+    'GEMINI_TRANSPORT',
+    'grpc' if SOCKETIO_ASYNC_MODE == 'threading' else 'rest'
+)
+if GEMINI_TRANSPORT == 'grpc' and SOCKETIO_ASYNC_MODE == 'eventlet':
+    logger.warning("⚠️  gRPC incompatible avec eventlet : transport Gemini REST")
+    GEMINI_TRANSPORT = 'rest'
+elif GEMINI_TRANSPORT == 'grpc' and SOCKETIO_ASYNC_MODE == 'gevent':
+    try:
+        from grpc.experimental import gevent as grpc_gevent
+        grpc_gevent.init_gevent()
+    except ImportError:
+        logger.warning("⚠️  grpc.experimental.gevent indisponible : transport Gemini REST")
+        GEMINI_TRANSPORT = 'rest'
 
 # Configuration CORS
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+# Compression des réponses JSON / HTML (liste des cours, scripts, analyses).
+# Les podcasts et PDF (déjà compressés, envoyés par send_file) et le flux SSE
+# de progression ne sont pas concernés.
+if Compress:
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_MIN_SIZE'] = 1024
+    # Pas de compression des réponses streamées : Flask-Compress les lirait
+    # en entier (get_data) avant l'envoi, ce qui annule le streaming de
+    # /api/courses et du flux SSE de progression
+    app.config['COMPRESS_STREAMS'] = False
+    app.config['COMPRESS_MIMETYPES'] = [
+        'application/json',
+        'text/html',
+        'text/css',
+        'text/javascript',
+        'application/javascript',
+        'text/plain'
+    ]
+    Compress(app)
+
 # Configuration SocketIO
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# Sérialiseur Socket.IO : 'json' (défaut) ou 'msgpack' (trames binaires,
+# clients équipés de socket.io-msgpack-parser)
+SOCKETIO_SERIALIZER = os.getenv('SOCKETIO_SERIALIZER', 'json').lower()
+if SOCKETIO_SERIALIZER == 'msgpack' and importlib.util.find_spec('msgpack') is None:
+    logger.warning("⚠️  msgpack non installé : sérialisation Socket.IO en JSON")
+    SOCKETIO_SERIALIZER = 'json'
+
+if SOCKETIO_SERIALIZER == 'msgpack':
+    socketio_options = {'serializer': 'msgpack'}
+else:
+    socketio_options = {'json': OrjsonSocketJSON if orjson else json}
+
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    async_mode=SOCKETIO_ASYNC_MODE,
+    **socketio_options
+)
+
+# Codes des actions audio dans les paquets 'audio_sync' compacts (msgpack)
+AUDIO_ACTION_CODES = {'play': 0, 'pause': 1, 'seek': 2}
+
+# Calculs bloquants en code natif sans réseau (encodage des embeddings, faiss,
+# rendu des QR codes). Sous eventlet/gevent, les pools ci-dessous sont des
+# green threads sur un seul thread système : ces calculs passent par le pool
+# de vrais threads du serveur pour ne pas figer la boucle d'évènements.
+# En mode threading, appel direct.
+if SOCKETIO_ASYNC_MODE == 'eventlet':
+    from eventlet import tpool
+    
+    def run_blocking(fn, *args, **kwargs):
+        return tpool.execute(fn, *args, **kwargs)
+elif SOCKETIO_ASYNC_MODE == 'gevent':
+    import gevent
+    
+    def run_blocking(fn, *args, **kwargs):
+        return gevent.get_hub().threadpool.apply(fn, args, kwargs)
+else:
+    def run_blocking(fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+# Pool de threads pour les appels Gemini indépendants (I/O réseau)
+gemini_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('GEMINI_MAX_WORKERS', 8)),
+    thread_name_prefix='gemini'
+)
+
+# Génération des QR codes hors du thread de la requête ; le fichier en
+# cours de génération est attendu par serve_qr_code
+qr_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='qr')
+pending_qr_codes = {}  # nom du fichier -> Future
+
+# Jobs en arrière-plan (analyses longues, réponse 202 + job_id)
+job_manager = BackgroundJobManager(
+    max_workers=int(os.getenv('JOB_MAX_WORKERS', 4)),
+    ttl_seconds=int(os.getenv('JOB_TTL', 3600))
+)
+
+# Dossiers de travail, résolus une fois au démarrage et réutilisés par les routes
+UPLOAD_DIR = Path(app.config['UPLOAD_FOLDER']).resolve()
+AUDIO_DIR, TRANSCRIPT_DIR, METADATA_DIR = (
+    Path('generated_podcasts', name).resolve()
+    for name in ('audio_files', 'transcripts', 'metadata')
+)
+QR_DIR = Path('mobile/static/qr_codes').resolve()
 
 # Créer les dossiers nécessaires
 REQUIRED_FOLDERS = [
-    'uploads',
-    'generated_podcasts/audio_files',
-    'generated_podcasts/transcripts',
-    'generated_podcasts/metadata',
-    'mobile/static/qr_codes',
-    'database',
-    'database/vector_embeddings'
+    UPLOAD_DIR,
+    AUDIO_DIR,
+    TRANSCRIPT_DIR,
+    METADATA_DIR,
+    QR_DIR,
+    Path('database'),
+    Path('database/vector_embeddings')
 ]
 
 for folder in REQUIRED_FOLDERS:
-    Path(folder).mkdir(parents=True, exist_ok=True)
+    folder.mkdir(parents=True, exist_ok=True)
+
+# Journal des métadonnées des podcasts : un seul fichier JSONL en ajout
+# (une ligne par podcast) au lieu d'un fichier JSON par document
+metadata_log = open(METADATA_DIR / 'all.jsonl', 'a', encoding='utf-8')
+metadata_log_lock = threading.Lock()
 
 # ============================================================================
 # INITIALISATION DES GESTIONNAIRES
 # ============================================================================
 
-print("🚀 Initialisation de l'application...")
+logger.info("🚀 Initialisation de l'application...")
 
 # Gestionnaires existants
 try:
     document_processor = UniversalDocumentProcessor()
-    print("✅ UniversalDocumentProcessor initialisé")
+    logger.info("✅ UniversalDocumentProcessor initialisé")
 except Exception as e:
-    print(f"⚠️  Erreur UniversalDocumentProcessor: {e}")
+    logger.warning("⚠️  Erreur UniversalDocumentProcessor: %s", e)
     document_processor = None
 
 try:
     knowledge_base = AMUKnowledgeBase()
-    print("✅ AMUKnowledgeBase initialisé")
+    logger.info("✅ AMUKnowledgeBase initialisé")
 except Exception as e:
-    print(f"⚠️  Erreur AMUKnowledgeBase: {e}")
+    logger.warning("⚠️  Erreur AMUKnowledgeBase: %s", e)
     knowledge_base = None
 
 try:
     script_generator = AudioScriptGenerator()
-    print("✅ AudioScriptGenerator initialisé")
+    logger.info("✅ AudioScriptGenerator initialisé")
 except Exception as e:
-    print(f"⚠️  Erreur AudioScriptGenerator: {e}")
+    logger.warning("⚠️  Erreur AudioScriptGenerator: %s", e)
     script_generator = None
 
 try:
     audio_generator = AudioGenerator()
-    print("✅ AudioGenerator initialisé")
+    logger.info("✅ AudioGenerator initialisé")
 except Exception as e:
-    print(f"⚠️  Erreur AudioGenerator: {e}")
+    logger.warning("⚠️  Erreur AudioGenerator: %s", e)
     audio_generator = None
 
 try:
     quiz_manager = InteractiveQuizManager()
-    print("✅ InteractiveQuizManager initialisé")
+    logger.info("✅ InteractiveQuizManager initialisé")
 except Exception as e:
-    print(f"⚠️  Erreur InteractiveQuizManager: {e}")
+    logger.warning("⚠️  Erreur InteractiveQuizManager: %s", e)
     quiz_manager = None
 
 # Gestionnaires mobiles
 try:
     sync_manager = MobileSyncManager(database_path='database/amu_courses.db')
-    print("✅ MobileSyncManager initialisé")
+    logger.info("✅ MobileSyncManager initialisé")
 except Exception as e:
-    print(f"⚠️  Erreur MobileSyncManager: {e}")
+    logger.warning("⚠️  Erreur MobileSyncManager: %s", e)
     sync_manager = None
 
 try:
-    qr_generator = QRCodeGenerator(output_dir='mobile/static/qr_codes')
-    print("✅ QRCodeGenerator initialisé")
+    qr_generator = QRCodeGenerator(output_dir=os.fspath(QR_DIR))
+    logger.info("✅ QRCodeGenerator initialisé")
 except Exception as e:
-    print(f"⚠️  Erreur QRCodeGenerator: {e}")
+    logger.warning("⚠️  Erreur QRCodeGenerator: %s", e)
     qr_generator = None
 
 try:
     rt_manager = RealTimeInteractionManager()
-    print("✅ RealTimeInteractionManager initialisé")
+    logger.info("✅ RealTimeInteractionManager initialisé")
 except Exception as e:
-    print(f"⚠️  Erreur RealTimeInteractionManager: {e}")
+    logger.warning("⚠️  Erreur RealTimeInteractionManager: %s", e)
     rt_manager = None
 
 # Gestionnaire Gemini et indexeur
@@ -172,52 +413,577 @@ try:
     # Configuration Gemini
     api_key = os.getenv('GOOGLE_API_KEY')
     if api_key:
-        genai.configure(api_key=api_key)
+        genai.configure(api_key=api_key, transport=GEMINI_TRANSPORT)
         gemini_model = genai.GenerativeModel(
-            model_name=os.getenv('GEMINI_MODEL', 'models/gemini-2.5-flash')
+            model_name=GEMINI_MODEL_NAME
         )
-        print("✅ Gemini API configurée")
+        logger.info("✅ Gemini API configurée")
     else:
         gemini_model = None
-        print("⚠️  GOOGLE_API_KEY non trouvée dans .env")
+        logger.warning("⚠️  GOOGLE_API_KEY non trouvée dans .env")
 except Exception as e:
-    print(f"⚠️  Erreur configuration Gemini: {e}")
+    logger.warning("⚠️  Erreur configuration Gemini: %s", e)
     gemini_model = None
 
+try:
+    db_pool = ConnectionPool('database/amu_courses.db')
+    logger.info("✅ ConnectionPool initialisé")
+except Exception as e:
+    logger.warning("⚠️  Erreur ConnectionPool: %s", e)
+    db_pool = None
+
 try:
     gemini_assistant = GeminiRAGAssistant(
-        course_index_db='database/amu_courses.db'
+        course_index_db='database/amu_courses.db',
+        # float32 par défaut : le produit matriciel BLAS est le plus rapide ;
+        # int8 / float16 réduisent la mémoire au prix de la latence
+        embedding_quantization=os.getenv('EMBEDDINGS_QUANTIZATION', '') or None,
+        ann_index=os.getenv('ANN_INDEX', 'hnsw') or None,
+        pool=db_pool,
+        transport=GEMINI_TRANSPORT
     )
-    print("✅ GeminiRAGAssistant initialisé")
+    logger.info("✅ GeminiRAGAssistant initialisé")
 except Exception as e:
-    print(f"⚠️  Erreur GeminiRAGAssistant: {e}")
+    logger.warning("⚠️  Erreur GeminiRAGAssistant: %s", e)
     gemini_assistant = None
 
 try:
     course_indexer = CourseIndexer(
         course_materials_path=os.getenv('COURSE_MATERIALS_PATH', 'data/course_materials'),
-        index_db_path='database/amu_courses.db'
+        index_db_path='database/amu_courses.db',
+        pool=db_pool
     )
-    print("✅ CourseIndexer initialisé")
+    logger.info("✅ CourseIndexer initialisé")
 except Exception as e:
-    print(f"⚠️  Erreur CourseIndexer: {e}")
+    logger.warning("⚠️  Erreur CourseIndexer: %s", e)
     course_indexer = None
 
-print("✅ Application initialisée avec succès!\n")
+try:
+    response_cache = ResponseCache(
+        db_path='database/response_cache.db',
+        ttl_seconds=int(os.getenv('RESPONSE_CACHE_TTL', 7 * 24 * 3600))
+    )
+    logger.info("✅ ResponseCache initialisé")
+except Exception as e:
+    logger.warning("⚠️  Erreur ResponseCache: %s", e)
+    response_cache = None
+
+try:
+    if gemini_assistant:
+        semantic_cache = SemanticCache(
+            embed_fn=gemini_assistant._generate_embedding,
+            db_path='database/semantic_cache.db',
+            threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.95)),
+            max_entries=int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', 1000)),
+            ttl_seconds=int(os.getenv('SEMANTIC_CACHE_TTL', 7 * 24 * 3600))
+        )
+        logger.info("✅ SemanticCache initialisé")
+    else:
+        semantic_cache = None
+except Exception as e:
+    logger.warning("⚠️  Erreur SemanticCache: %s", e)
+    semantic_cache = None
+
+try:
+    media_index = MediaIndex(db_path='database/media_index.db')
+    logger.info("✅ MediaIndex initialisé")
+except Exception as e:
+    logger.warning("⚠️  Erreur MediaIndex: %s", e)
+    media_index = None
+
+def warm_up_gemini():
+    """Ouvre le canal Gemini avec un appel minimal (évite la poignée de main TLS au 1er utilisateur)."""
+    try:
+        gemini_model.generate_content(
+            "ping",
+            generation_config=genai.types.GenerationConfig(max_output_tokens=1)
+        )
+        logger.info("✅ Connexion Gemini préchauffée")
+    except Exception as e:
+        logger.warning("⚠️  Erreur préchauffage Gemini: %s", e)
+
+# Préchauffage en arrière-plan, après le dernier genai.configure()
+# (chaque appel à configure recrée le client et son canal)
+if gemini_model and os.getenv('GEMINI_WARMUP', '1') == '1':
+    gemini_executor.submit(warm_up_gemini)
+
+# Répertoire courant et dossier des cours : constants pendant la vie du processus
+CURRENT_DIR = os.getcwd()
+COURSE_MATERIALS_DIR = Path(os.getenv('COURSE_MATERIALS_PATH', 'data/course_materials'))
+
+def build_pdf_path_index():
+    """
+    Indexe les PDF des cours par nom de fichier (nom -> chemin absolu).
+    
+    Construit au démarrage et après chaque réindexation : le téléchargement
+    d'un cours dont le chemin en base est obsolète ne parcourt plus toute
+    l'arborescence.
+    """
+    if not COURSE_MATERIALS_DIR.exists():
+        return {}
+    return {pdf.name: pdf.resolve() for pdf in COURSE_MATERIALS_DIR.rglob('*.pdf')}
+
+pdf_path_index = build_pdf_path_index()
+logger.info("✅ %s PDF indexés par nom de fichier", len(pdf_path_index))
+
+logger.info("✅ Application initialisée avec succès!\n")
 
 # ============================================================================
 # FONCTIONS UTILITAIRES
 # ============================================================================
 
+# Extensions autorisées avec leur point, calculées une fois (comparées à splitext)
+ALLOWED_SUFFIXES = frozenset(f".{ext}" for ext in app.config['ALLOWED_EXTENSIONS'])
+
 def allowed_file(filename):
     """Vérifie si le fichier a une extension autorisée."""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+    return os.path.splitext(filename)[1].lower() in ALLOWED_SUFFIXES
 
 def generate_unique_id():
     """Génère un ID unique."""
     return str(uuid.uuid4())
 
+def truncate_on_word(text, limit):
+    """Tronque un texte sur une frontière de mot (coupure stable d'une requête à l'autre)."""
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(' ', 1)[0]
+
+def make_text_preview(text, limit=500):
+    """Retourne l'aperçu d'un texte, tronqué à `limit` caractères."""
+    return text[:limit] + ('...' if len(text) > limit else '')
+
+# Début d'un tableau d'objets JSON dans une réponse de Gemini
+JSON_ARRAY_START_RE = re.compile(r'\[\s*\{')
+json_decoder = json.JSONDecoder()
+
+def parse_json_array(text):
+    """
+    Extrait le tableau JSON d'une réponse de Gemini (texte parasite possible).
+    
+    Le cas courant (du premier '[' au dernier ']') se décode sans regex ;
+    sinon le décodage est tenté à partir de chaque début de tableau d'objets.
+    
+    Returns:
+        Liste décodée ou None
+    """
+    start = text.find('[')
+    end = text.rfind(']')
+    if start == -1 or end < start:
+        return None
+    
+    try:
+        return orjson.loads(text[start:end + 1]) if orjson else json.loads(text[start:end + 1])
+    except ValueError:
+        pass
+    
+    for match in JSON_ARRAY_START_RE.finditer(text, start):
+        try:
+            value, _ = json_decoder.raw_decode(text, match.start())
+            return value
+        except ValueError:
+            continue
+    
+    return None
+
+def save_upload(file, file_path):
+    """
+    Écrit un fichier uploadé sur disque par gros blocs.
+    
+    Le contenu est d'abord copié dans un fichier .part puis renommé de façon
+    atomique : un fichier incomplet n'est jamais visible sous son nom final.
+    L'empreinte SHA-256 est calculée pendant la copie.
+    
+    Returns:
+        Empreinte SHA-256 hexadécimale du fichier
+    """
+    file_path = Path(file_path)
+    part_path = file_path.with_name(file_path.name + '.part')
+    chunk_size = app.config['UPLOAD_CHUNK_SIZE']
+    digest = hashlib.sha256()
+    
+    try:
+        with open(part_path, 'wb') as f:
+            while True:
+                chunk = file.stream.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+        os.replace(part_path, file_path)
+    except Exception:
+        if part_path.exists():
+            part_path.unlink()
+        raise
+    
+    return digest.hexdigest()
+
+def hash_file(file_path):
+    """Calcule l'empreinte SHA-256 d'un fichier déjà sur disque."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(app.config['UPLOAD_CHUNK_SIZE']), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def store_upload(file):
+    """
+    Enregistre un fichier uploadé et l'inscrit dans l'index des médias.
+    
+    Chaque upload garde son propre fichier (nom d'origine, suppression
+    indépendante) ; seul le texte extrait est partagé entre uploads de
+    même contenu, via son empreinte SHA-256 (voir extract_document_text).
+    
+    Returns:
+        (file_id, nom de fichier sécurisé, chemin du fichier)
+    """
+    filename = secure_filename(file.filename)
+    file_id = generate_unique_id()
+    file_path = UPLOAD_DIR / f"{file_id}_{filename}"
+    file_sha = save_upload(file, file_path)
+    
+    if media_index:
+        media_index.register_upload(file_id, os.fspath(file_path), file_sha)
+    
+    return file_id, filename, file_path
+
+def extract_document_text(file_id, file_path):
+    """
+    Extrait le texte d'un document uploadé, une seule fois par contenu.
+    
+    Le résultat est mis en cache par empreinte SHA-256 dans l'index des
+    médias : /api/upload, /api/process et /api/upload-and-explain ne
+    relancent pas l'extraction (OCR compris) sur un même fichier.
+    """
+    sha256 = media_index.get_sha256(file_id) if media_index else None
+    if media_index and not sha256:
+        sha256 = hash_file(file_path)
+    
+    if sha256:
+        cached = media_index.get_extracted_text(sha256)
+        if cached is not None:
+            return cached
+    
+    extracted = document_processor.process_document(os.fspath(file_path))
+    
+    if sha256:
+        media_index.set_extracted_text(sha256, extracted)
+    
+    return extracted
+
+def append_metadata(metadata):
+    """Ajoute les métadonnées d'un podcast au journal JSONL (sans fsync)."""
+    line = app.json.dumps(metadata) + '\n'
+    with metadata_log_lock:
+        metadata_log.write(line)
+        metadata_log.flush()
+
+def is_regular_file(path):
+    """Vérifie qu'un chemin désigne un fichier ordinaire (un seul appel stat)."""
+    try:
+        return stat.S_ISREG(os.stat(path).st_mode)
+    except (OSError, ValueError):
+        return False
+
+def find_upload_path(file_id):
+    """
+    Retrouve le fichier uploadé associé à un file_id.
+    
+    Le chemin est lu dans l'index des médias ; le parcours du dossier
+    ne sert que pour les fichiers uploadés avant la création de l'index,
+    qui y sont alors enregistrés (le parcours n'a lieu qu'une fois).
+    
+    Returns:
+        Path du fichier ou None
+    """
+    if media_index:
+        upload_path = media_index.get_upload_path(file_id)
+        if upload_path:
+            return Path(upload_path)
+    
+    prefix = f"{file_id}_"
+    with os.scandir(UPLOAD_DIR) as entries:
+        for entry in entries:
+            if entry.name.startswith(prefix) and not entry.name.endswith('.part'):
+                if media_index:
+                    media_index.register_upload(file_id, entry.path)
+                return Path(entry.path)
+    
+    return None
+
+def find_audio_path(file_id):
+    """
+    Retrouve le podcast généré pour un file_id.
+    
+    Returns:
+        Path du fichier audio ou None
+    """
+    if media_index:
+        audio_path = media_index.get_audio_path(file_id)
+        if audio_path:
+            return Path(audio_path)
+    
+    # Podcasts générés avant l'index : trouvés une fois puis enregistrés
+    with os.scandir(AUDIO_DIR) as entries:
+        for entry in entries:
+            if file_id in entry.name:
+                if media_index:
+                    media_index.set_audio_path(file_id, entry.path)
+                return Path(entry.path)
+    
+    return None
+
+def send_media_file(file_path, mimetype, accel_prefix, accel_root=None, download_name=None):
+    """
+    Envoie un fichier en laissant le proxy frontal le servir si possible.
+    
+    Avec SENDFILE_MODE='accel', nginx sert le fichier depuis la location
+    interne accel_prefix ; avec 'xsendfile', Apache le sert depuis son
+    chemin absolu. Sinon le fichier est streamé par Flask. Hors mode accel,
+    la réponse porte un ETag et une date de modification : un client qui a
+    déjà le fichier reçoit un 304 sans corps.
+    
+    Args:
+        file_path: Chemin du fichier à envoyer
+        mimetype: Type MIME de la réponse
+        accel_prefix: Location interne nginx correspondant au dossier du fichier
+        accel_root: Dossier servi par accel_prefix, pour les fichiers rangés
+            dans des sous-dossiers (par défaut : seul le nom du fichier est utilisé)
+        download_name: Nom proposé au téléchargement (pièce jointe), ou None
+            pour un affichage dans le navigateur
+    """
+    mode = app.config['SENDFILE_MODE']
+    file_path = Path(file_path)
+    
+    if mode == 'accel':
+        if accel_root is None:
+            relative_path = file_path.name
+        else:
+            try:
+                relative_path = file_path.resolve().relative_to(Path(accel_root).resolve()).as_posix()
+            except ValueError:
+                relative_path = None  # Hors de la location nginx : servi par Flask
+        
+        if relative_path is not None:
+            response = Response(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = accel_prefix + quote(relative_path)
+            if download_name:
+                response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+            return response
+    
+    # Mode 'xsendfile' : send_file émet l'en-tête X-Sendfile (app.use_x_sendfile)
+    return send_file(
+        os.path.realpath(file_path) if mode == 'xsendfile' else os.path.abspath(file_path),
+        mimetype=mimetype,
+        as_attachment=download_name is not None,
+        download_name=download_name,
+        conditional=True,
+        etag=True,
+        max_age=app.config['MEDIA_MAX_AGE']
+    )
+
+def answer_with_semantic_cache(question, level=None, include_sources=True, stream_room=None, stream_id=None):
+    """
+    Répond à une question via l'assistant Gemini en réutilisant la réponse
+    d'une question très similaire déjà posée (cache sémantique).
+    
+    Avec stream_room, la réponse est aussi poussée au client via SocketIO
+    (évènements 'answer_chunk' puis 'answer_done', portant stream_id).
+    """
+    scope = f"{level or 'all'}|{int(bool(include_sources))}"
+    
+    if semantic_cache:
+        cached = semantic_cache.get(question, scope=scope)
+        if cached:
+            logger.debug("⚡ Réponse récupérée depuis le cache sémantique")
+            if stream_room:
+                emit_whole_stream('answer', cached['answer'], stream_room, stream_id=stream_id)
+            return cached
+    
+    result = gemini_assistant.answer_question(
+        question=question,
+        level=level,
+        include_sources=include_sources,
+        on_chunk=stream_emitter('answer', stream_room, stream_id=stream_id) if stream_room else None
+    )
+    if stream_room:
+        socketio.emit('answer_done', {'stream_id': stream_id}, room=stream_room)
+    
+    if semantic_cache:
+        semantic_cache.set(question, result, scope=scope)
+    
+    return result
+
+def stream_emitter(event, room, **ids):
+    """
+    Fonction qui pousse un fragment de texte au client via SocketIO
+    (évènement '<event>_chunk', avec les identifiants ids).
+    """
+    def on_chunk(text):
+        socketio.emit(f'{event}_chunk', {**ids, 'text': text}, room=room)
+    
+    return on_chunk
+
+def emit_whole_stream(event, text, room, **ids):
+    """
+    Pousse un texte déjà complet (réponse en cache) comme un flux d'un seul
+    fragment, suivi de '<event>_done' : le client n'attend pas un flux qui
+    ne viendra jamais.
+    """
+    socketio.emit(f'{event}_chunk', {**ids, 'text': text}, room=room)
+    socketio.emit(f'{event}_done', ids, room=room)
+
+def generate_streamed_explanation(prompt, generation_config, room, **ids):
+    """
+    Génère une explication en streaming et pousse chaque fragment au client
+    via SocketIO (évènement 'explanation_chunk') au fur et à mesure.
+    
+    Args:
+        prompt: Prompt envoyé à Gemini
+        generation_config: Paramètres de génération
+        room: Room SocketIO du client
+        **ids: Identifiants ajoutés à chaque évènement (file_id, stream_id)
+    
+    Returns:
+        Texte complet de l'explication
+    """
+    on_chunk = stream_emitter('explanation', room, **ids)
+    parts = []
+    
+    for chunk in gemini_model.generate_content(
+        prompt,
+        generation_config=generation_config,
+        stream=True
+    ):
+        try:
+            text = chunk.text
+        except (ValueError, AttributeError):
+            # Fragment sans texte (ex: métadonnées de fin de génération)
+            continue
+        
+        parts.append(text)
+        on_chunk(text)
+    
+    socketio.emit('explanation_done', ids, room=room)
+    
+    return ''.join(parts)
+
+def analyze_document_with_gemini(extracted_text, file_id=None, stream_room=None):
+    """
+    Analyse un texte extrait avec Gemini : mots-clés, cours AMU pertinents,
+    explication détaillée et résumé court.
+    
+    Args:
+        extracted_text: Texte extrait du document
+        file_id: Identifiant du fichier uploadé
+        stream_room: Room SocketIO où streamer l'explication (optionnel)
+    
+    Returns:
+        Dictionnaire avec keywords, summary, explanation et relevant_courses
+    """
+    # Extraits du texte envoyés à Gemini, découpés une seule fois
+    # (chaque extrait court est pris dans le précédent, pas dans le texte complet)
+    head_3000 = extracted_text[:3000]
+    head_2000 = head_3000[:2000]
+    head_1500 = head_2000[:1500]
+    
+    # 1. Lancer en parallèle l'analyse du sujet et le résumé court
+    #    (indépendants : seule l'explication dépend des mots-clés)
+    logger.debug("🔍 Analyse du sujet avec Gemini...")
+    subject_prompt = SUBJECT_PROMPT_TMPL.substitute(text=head_1500)
+    
+    logger.debug("📝 Génération du résumé...")
+    summary_prompt = SUMMARY_PROMPT_TMPL.substitute(text=head_2000)
+    
+    subject_future = gemini_executor.submit(gemini_model.generate_content, subject_prompt)
+    summary_future = gemini_executor.submit(gemini_model.generate_content, summary_prompt)
+    
+    keywords = extract_gemini_response(subject_future.result()).strip()
+    logger.debug("🏷️  Mots-clés identifiés : %s", keywords)
+    
+    # 2. Chercher des cours pertinents dans data/course_materials/
+    relevant_courses = []
+    if gemini_assistant:
+        logger.debug("📚 Recherche de cours pertinents...")
+        try:
+            relevant_chunks = run_blocking(
+                gemini_assistant.find_relevant_chunks,
+                query=keywords,
+                top_k=5
+            )
+            
+            # Dédupliquer par doc_id
+            seen_docs = set()
+            for chunk in relevant_chunks:
+                doc_id = chunk['doc_id']
+                if doc_id not in seen_docs:
+                    relevant_courses.append({
+                        'doc_id': doc_id,
+                        'title': chunk['title'],
+                        'level': chunk['level'],
+                        'category': chunk['category'],
+                        'file_path': chunk['file_path'],
+                        'relevance': round(chunk['similarity'] * 100, 1),
+                        'content_preview': truncate_on_word(chunk['content'], 300) + '...'
+                    })
+                    seen_docs.add(doc_id)
+            
+            logger.debug("✅ %s cours pertinents trouvés", len(relevant_courses))
+        except Exception as e:
+            logger.warning("⚠️  Erreur recherche de cours : %s", e)
+    
+    # 3. Générer l'explication avec Gemini + références aux cours
+    logger.debug("🤖 Génération de l'explication avec Gemini...")
+    
+    if relevant_courses:
+        # Construire le contexte avec les 3 cours les plus pertinents, dans un
+        # ordre stable (doc_id) et sans le score : le prompt reste identique
+        # pour des requêtes proches (cache de réponses et cache de préfixe)
+        context_courses = sorted(relevant_courses[:3], key=lambda c: c['doc_id'])
+        context_parts = []
+        for i, course in enumerate(context_courses, 1):
+            context_parts.append(
+                f"[Cours {i}: {course['title']} - {course['level']}/{course['category']}]\n"
+                f"{course['content_preview']}"
+            )
+        
+        context = "\n\n---\n\n".join(context_parts)
+        
+        explanation_prompt = EXPLANATION_WITH_CONTEXT_PROMPT_TMPL.substitute(
+            text=head_3000,
+            context=context
+        )
+    else:
+        explanation_prompt = EXPLANATION_PROMPT_TMPL.substitute(text=head_3000)
+    
+    explanation_config = genai.types.GenerationConfig(
+        temperature=0.7,
+        max_output_tokens=2048
+    )
+    
+    if stream_room:
+        explanation = generate_streamed_explanation(
+            explanation_prompt, explanation_config, stream_room, file_id=file_id
+        )
+    else:
+        explanation_response = gemini_model.generate_content(
+            explanation_prompt,
+            generation_config=explanation_config
+        )
+        explanation = extract_gemini_response(explanation_response)
+    logger.debug("✅ Explication générée")
+    
+    # 4. Récupérer le résumé généré en parallèle
+    summary = extract_gemini_response(summary_future.result()).strip()
+    
+    return {
+        'keywords': keywords,
+        'summary': summary,
+        'explanation': explanation,
+        'relevant_courses': relevant_courses
+    }
+
+
 # ============================================================================
 # ROUTES PRINCIPALES
 # ============================================================================
@@ -244,13 +1010,117 @@ def health_check():
         }
     })
 
+def explain_uploaded_file(file_id, filename, file_path, stream_room=None):
+    """
+    Extrait le texte d'un document uploadé et l'analyse avec Gemini.
+    
+    Utilisé directement par /api/upload-and-explain ou comme job en
+    arrière-plan (mode asynchrone).
+    
+    Args:
+        file_id: Identifiant du fichier uploadé
+        filename: Nom du fichier (sécurisé)
+        file_path: Chemin du fichier sur le disque
+        stream_room: Room SocketIO pour streamer l'explication (optionnel)
+    
+    Returns:
+        Dictionnaire de la réponse complète
+    
+    Raises:
+        ValueError: Si le document est trop court ou vide
+    """
+    # 2. Extraire le texte du document
+    if document_processor:
+        extracted_text = extract_document_text(file_id, file_path)
+        logger.debug("✅ Texte extrait : %s caractères", len(extracted_text))
+    else:
+        raise RuntimeError('Document processor non disponible')
+    
+    if len(extracted_text) < 50:
+        raise ValueError('Document trop court ou vide')
+    
+    # 3. Réutiliser l'analyse si ce contenu a déjà été traité
+    cache_key = ResponseCache.make_key(GEMINI_MODEL_NAME, PROMPT_VERSION, extracted_text)
+    analysis = response_cache.get(cache_key) if response_cache else None
+    
+    if analysis:
+        logger.debug("⚡ Analyse récupérée depuis le cache")
+        if stream_room:
+            emit_whole_stream('explanation', analysis['explanation'], stream_room, file_id=file_id)
+    else:
+        # 4. Analyse complète avec Gemini (mots-clés, cours, explication, résumé)
+        analysis = analyze_document_with_gemini(
+            extracted_text,
+            file_id=file_id,
+            stream_room=stream_room
+        )
+        if response_cache:
+            response_cache.set(cache_key, analysis)
+    
+    keywords = analysis['keywords']
+    summary = analysis['summary']
+    explanation = analysis['explanation']
+    relevant_courses = analysis['relevant_courses']
+    
+    # 5. Retourner la réponse complète
+    response_data = {
+        'success': True,
+        'file_id': file_id,
+        'filename': filename,
+        'keywords': keywords,
+        'summary': summary,
+        'explanation': explanation,
+        'relevant_courses': relevant_courses,
+        'has_course_references': len(relevant_courses) > 0,
+        'text_length': len(extracted_text),
+        'text_preview': make_text_preview(extracted_text)
+    }
+    
+    logger.debug("✅ Réponse complète générée pour %s", filename)
+    return response_data
+
+def preview_uploaded_file(file_id, file_path):
+    """
+    Extrait le texte d'un document uploadé (job en arrière-plan de /api/upload).
+    
+    Returns:
+        Aperçu et longueur du texte extrait
+    """
+    if document_processor:
+        extracted_text = extract_document_text(file_id, file_path)
+    else:
+        extracted_text = "Document processor non disponible"
+    
+    return {
+        'file_id': file_id,
+        'text_preview': make_text_preview(extracted_text),
+        'text_length': len(extracted_text)
+    }
+
+def notify_upload_done(job, file_id, room=None):
+    """Prévient le client SocketIO de la fin d'une analyse asynchrone."""
+    if room:
+        socketio.emit('upload_done', {
+            'job_id': job['job_id'],
+            'file_id': file_id,
+            'status': job['status'],
+            'result': job['result'],
+            'error': job['error']
+        }, room=room)
+
 # ============================================================================
 # ROUTES UPLOAD ET TRAITEMENT DE DOCUMENTS AVEC GEMINI
 # ============================================================================
 
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
-    """Upload simple d'un document."""
+    """
+    Upload simple d'un document.
+    
+    Le fichier est enregistré puis la réponse part tout de suite (202 +
+    job_id) ; l'extraction du texte tourne en arrière-plan et son aperçu
+    est disponible sur /api/upload/status/<job_id>.
+    """
     if 'file' not in request.files:
         return jsonify({'error': 'Aucun fichier fourni'}), 400
     
@@ -264,33 +1134,40 @@ def upload_file():
     
     try:
         # Sauvegarder le fichier
-        filename = secure_filename(file.filename)
-        file_id = generate_unique_id()
-        file_path = Path(app.config['UPLOAD_FOLDER']) / f"{file_id}_{filename}"
-        file.save(str(file_path))
+        file_id, filename, file_path = store_upload(file)
         
-        # Traiter le document
-        if document_processor:
-            extracted_text = document_processor.process_document(str(file_path))
-        else:
-            extracted_text = "Document processor non disponible"
+        # Traiter le document en arrière-plan
+        job_id = job_manager.submit(preview_uploaded_file, file_id, file_path)
         
         return jsonify({
             'success': True,
+            'job_id': job_id,
             'file_id': file_id,
             'filename': filename,
-            'text_preview': extracted_text[:500] + '...' if len(extracted_text) > 500 else extracted_text,
-            'text_length': len(extracted_text)
-        })
+            'status_url': f'/api/upload/status/{job_id}'
+        }), 202
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/upload/status/<job_id>')
+def get_upload_status(job_id):
+    """Récupère l'état (et l'aperçu du texte) d'une extraction en arrière-plan."""
+    return get_job_status(job_id)
+
 @app.route('/api/upload-and-explain', methods=['POST'])
 def upload_and_explain():
     """
     Upload un document, l'explique avec Gemini et cherche des références
     dans les cours existants de data/course_materials/
+    
+    Form data:
+    - file: document à analyser
+    - socket_sid: (optionnel) sid SocketIO du client pour recevoir
+      l'explication en streaming (évènements explanation_chunk / explanation_done)
+    - async: (optionnel) '1' pour répondre immédiatement (202 + job_id) ;
+      le résultat est ensuite disponible sur /api/job/<job_id> et envoyé
+      au client SocketIO (évènement upload_done)
     """
     if 'file' not in request.files:
         return jsonify({'error': 'Aucun fichier fourni'}), 400
@@ -308,239 +1185,206 @@ def upload_and_explain():
     
     try:
         # 1. Sauvegarder le fichier uploadé
-        filename = secure_filename(file.filename)
-        file_id = generate_unique_id()
-        file_path = Path(app.config['UPLOAD_FOLDER']) / f"{file_id}_{filename}"
-        file.save(str(file_path))
-        
-        print(f"📄 Fichier uploadé : {filename}")
-        
-        # 2. Extraire le texte du document
-        if document_processor:
-            extracted_text = document_processor.process_document(str(file_path))
-            print(f"✅ Texte extrait : {len(extracted_text)} caractères")
-        else:
-            return jsonify({'error': 'Document processor non disponible'}), 500
-        
-        if len(extracted_text) < 50:
-            return jsonify({'error': 'Document trop court ou vide'}), 400
-        
-        # 3. Analyser le contenu pour identifier le sujet
-        print("🔍 Analyse du sujet avec Gemini...")
-        subject_prompt = f"""Analyse ce texte et identifie le sujet principal en quelques mots-clés pertinents pour la Data Science.
-
-Texte:
-{extracted_text[:1500]}
-
-Réponds UNIQUEMENT avec 3-5 mots-clés séparés par des virgules (ex: machine learning, régression, python).
-Ne donne pas d'explication, juste les mots-clés."""
-        
-        subject_response = gemini_model.generate_content(subject_prompt)
-        keywords = extract_gemini_response(subject_response).strip()
-        print(f"🏷️  Mots-clés identifiés : {keywords}")
+        file_id, filename, file_path = store_upload(file)
         
-        # 4. Chercher des cours pertinents dans data/course_materials/
-        relevant_courses = []
-        if gemini_assistant:
-            print("📚 Recherche de cours pertinents...")
-            try:
-                relevant_chunks = gemini_assistant.find_relevant_chunks(
-                    query=keywords,
-                    top_k=5
-                )
-                
-                # Dédupliquer par doc_id
-                seen_docs = set()
-                for chunk in relevant_chunks:
-                    doc_id = chunk['doc_id']
-                    if doc_id not in seen_docs:
-                        relevant_courses.append({
-                            'doc_id': doc_id,
-                            'title': chunk['title'],
-                            'level': chunk['level'],
-                            'category': chunk['category'],
-                            'file_path': chunk['file_path'],
-                            'relevance': round(chunk['similarity'] * 100, 1),
-                            'content_preview': chunk['content'][:300] + '...'
-                        })
-                        seen_docs.add(doc_id)
-                
-                print(f"✅ {len(relevant_courses)} cours pertinents trouvés")
-            except Exception as e:
-                print(f"⚠️  Erreur recherche de cours : {e}")
+        logger.debug("📄 Fichier uploadé : %s", filename)
         
-        # 5. Générer l'explication avec Gemini + références aux cours
-        print("🤖 Génération de l'explication avec Gemini...")
+        stream_room = request.form.get('socket_sid')
         
-        if relevant_courses:
-            # Construire le contexte avec les cours trouvés
-            context_parts = []
-            for i, course in enumerate(relevant_courses[:3], 1):
-                context_parts.append(
-                    f"[Cours {i}: {course['title']} - {course['level']}/{course['category']} - Pertinence: {course['relevance']}%]\n"
-                    f"{course['content_preview']}"
-                )
-            
-            context = "\n\n---\n\n".join(context_parts)
-            
-            explanation_prompt = f"""Tu es un assistant pédagogique expert en Data Science pour l'université AMU.
-
-DOCUMENT UPLOADÉ PAR L'ÉTUDIANT:
-{extracted_text[:3000]}
-
-COURS DE RÉFÉRENCE DISPONIBLES DANS LA BASE AMU:
-{context}
-
-TÂCHE:
-1. Explique le contenu du document uploadé de manière claire et pédagogique
-2. Fais des liens explicites avec les cours de référence AMU mentionnés ci-dessus
-3. Structure ta réponse avec des sections claires (utilise des titres avec **)
-4. Cite les cours AMU pertinents (ex: "Selon le cours Machine Learning M1...")
-5. Ajoute des exemples concrets si pertinent
-6. Si le document traite d'un sujet similaire à un cours AMU, mentionne-le
-
-EXPLICATION DÉTAILLÉE:"""
-        else:
-            explanation_prompt = f"""Tu es un assistant pédagogique expert en Data Science pour l'université AMU.
-
-DOCUMENT UPLOADÉ PAR L'ÉTUDIANT:
-{extracted_text[:3000]}
-
-TÂCHE:
-1. Explique le contenu de ce document de manière claire et pédagogique
-2. Structure ta réponse avec des sections claires (utilise des titres avec **)
-3. Ajoute des exemples concrets si pertinent
-4. Indique que ce sujet n'est pas directement couvert dans les cours AMU disponibles
-
-EXPLICATION DÉTAILLÉE:"""
-        
-        explanation_response = gemini_model.generate_content(
-            explanation_prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=2048
+        # Mode asynchrone : l'analyse tourne en arrière-plan, réponse immédiate
+        if request.values.get('async') == '1':
+            job_id = job_manager.submit(
+                explain_uploaded_file,
+                file_id, filename, file_path, stream_room,
+                on_done=lambda job: notify_upload_done(job, file_id, stream_room)
             )
-        )
-        explanation = extract_gemini_response(explanation_response)
-        print("✅ Explication générée")
-        
-        # 6. Générer un résumé court
-        print("📝 Génération du résumé...")
-        summary_prompt = f"""Résume en 2-3 phrases claires le contenu principal de ce document:
-
-{extracted_text[:2000]}
-
-Résumé concis:"""
-        
-        summary_response = gemini_model.generate_content(summary_prompt)
-        summary = extract_gemini_response(summary_response).strip()
-        
-        # 7. Retourner la réponse complète
-        response_data = {
-            'success': True,
-            'file_id': file_id,
-            'filename': filename,
-            'keywords': keywords,
-            'summary': summary,
-            'explanation': explanation,
-            'relevant_courses': relevant_courses,
-            'has_course_references': len(relevant_courses) > 0,
-            'text_length': len(extracted_text),
-            'text_preview': extracted_text[:500] + '...' if len(extracted_text) > 500 else extracted_text
-        }
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'file_id': file_id,
+                'filename': filename,
+                'status_url': f'/api/job/{job_id}'
+            }), 202
         
-        print(f"✅ Réponse complète générée pour {filename}")
+        response_data = explain_uploaded_file(file_id, filename, file_path, stream_room)
         return jsonify(response_data)
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     except Exception as e:
-        print(f"❌ Erreur : {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Erreur upload-and-explain : %s", e)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/job/<job_id>')
+def get_job_status(job_id):
+    """Récupère l'état (et le résultat) d'un job en arrière-plan."""
+    job = job_manager.get(job_id)
+    
+    if job is None:
+        return jsonify({'error': 'Job non trouvé'}), 404
+    
+    return jsonify(job)
+
+def generate_podcast(file_id, file_path, options, progress=None):
+    """
+    Génère le podcast d'un document uploadé : extraction du texte, script
+    puis synthèse audio. Exécuté en arrière-plan par /api/process/<file_id>.
+    
+    Args:
+        file_id: Identifiant du fichier uploadé
+        file_path: Chemin du fichier sur le disque
+        options: Options de génération (style, duration, voice)
+        progress: Fonction progress(stage, pct) signalant l'avancement
+    
+    Returns:
+        Résultat sérialisable en JSON (URL audio, script, métadonnées)
+    """
+    progress = progress or (lambda stage, pct: None)
+    
+    # Extraire le texte
+    progress('extract', 5)
+    text = extract_document_text(file_id, file_path)
+    
+    # Générer le script audio
+    progress('script', 30)
+    if script_generator:
+        script = script_generator.generate_script(
+            text,
+            style=options.get('style', 'educational'),
+            duration_target=options.get('duration', 10)
+        )
+    else:
+        script = text
+    
+    # Générer l'audio
+    progress('tts', 60)
+    audio_path = audio_generator.generate_audio(
+        script,
+        output_dir=os.fspath(AUDIO_DIR),
+        voice=options.get('voice', 'default')
+    )
+    
+    if media_index:
+        media_index.set_audio_path(file_id, os.fspath(audio_path))
+    
+    # Sauvegarder les métadonnées
+    metadata = {
+        'file_id': file_id,
+        'original_filename': file_path.name,
+        'generated_at': datetime.now().isoformat(),
+        'script_length': len(script),
+        'audio_path': os.fspath(audio_path),
+        'options': options
+    }
+    
+    append_metadata(metadata)
+    if media_index:
+        media_index.set_metadata(file_id, metadata)
+    
+    return {
+        'success': True,
+        'audio_url': f'/api/audio/{file_id}',
+        'script': script,
+        'metadata': metadata
+    }
+
 @app.route('/api/process/<file_id>', methods=['POST'])
 def process_document(file_id):
-    """Traite un document uploadé pour générer un podcast."""
+    """
+    Lance la génération du podcast d'un document uploadé en arrière-plan.
+    
+    Répond immédiatement (202 + job_id) ; l'état et le résultat sont
+    disponibles sur /api/process/status/<job_id>.
+    """
     try:
-        data = request.json
+        data = request.get_json(silent=True) or {}
         options = data.get('options', {})
         
         # Récupérer le fichier
-        upload_folder = Path(app.config['UPLOAD_FOLDER'])
-        file_path = None
-        
-        for file in upload_folder.glob(f"{file_id}_*"):
-            file_path = file
-            break
+        file_path = find_upload_path(file_id)
         
         if not file_path:
             return jsonify({'error': 'Fichier non trouvé'}), 404
         
-        # Extraire le texte
-        if document_processor:
-            text = document_processor.process_document(str(file_path))
-        else:
+        if not document_processor:
             return jsonify({'error': 'Document processor non disponible'}), 500
         
-        # Générer le script audio
-        if script_generator:
-            script = script_generator.generate_script(
-                text,
-                style=options.get('style', 'educational'),
-                duration_target=options.get('duration', 10)
-            )
-        else:
-            script = text
-        
-        # Générer l'audio
-        if audio_generator:
-            audio_path = audio_generator.generate_audio(
-                script,
-                output_dir='generated_podcasts/audio_files',
-                voice=options.get('voice', 'default')
-            )
-        else:
+        if not audio_generator:
             return jsonify({'error': 'Audio generator non disponible'}), 500
         
-        # Sauvegarder les métadonnées
-        metadata = {
-            'file_id': file_id,
-            'original_filename': file_path.name,
-            'generated_at': datetime.now().isoformat(),
-            'script_length': len(script),
-            'audio_path': str(audio_path),
-            'options': options
-        }
-        
-        metadata_path = Path('generated_podcasts/metadata') / f"{file_id}_metadata.json"
-        import json
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        job_id = job_manager.submit(
+            generate_podcast,
+            file_id, file_path, options,
+            with_progress=True
+        )
         
         return jsonify({
             'success': True,
-            'audio_url': f'/api/audio/{file_id}',
-            'script': script,
-            'metadata': metadata
-        })
+            'job_id': job_id,
+            'file_id': file_id,
+            'status_url': f'/api/process/status/{job_id}',
+            'progress_url': f'/api/process/progress/{job_id}'
+        }), 202
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/process/status/<job_id>')
+def get_process_status(job_id):
+    """Récupère l'état (et le résultat) d'une génération de podcast."""
+    return get_job_status(job_id)
+
+@app.route('/api/process/progress/<job_id>')
+def stream_process_progress(job_id):
+    """
+    Diffuse l'avancement d'une génération de podcast (Server-Sent Events).
+    
+    Une seule connexion HTTP par job au lieu d'un sondage répété de
+    /api/process/status ; le flux se termine sur l'étape 'done' ou 'error'.
+    """
+    events = job_manager.subscribe(job_id)
+    
+    if events is None:
+        return jsonify({'error': 'Job non trouvé'}), 404
+    
+    heartbeat = int(os.getenv('SSE_HEARTBEAT', 15))
+    
+    def generate():
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"  # Garde la connexion ouverte (proxys)
+                    continue
+                
+                yield f"data: {app.json.dumps(event)}\n\n"
+                if event['stage'] in ('done', 'error'):
+                    break
+        finally:
+            job_manager.unsubscribe(job_id, events)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/audio/<file_id>')
 def get_audio(file_id):
     """Récupère le fichier audio généré."""
     try:
-        audio_folder = Path('generated_podcasts/audio_files')
+        audio_file = find_audio_path(file_id)
         
-        for audio_file in audio_folder.glob(f"*{file_id}*"):
-            return send_file(
-                str(audio_file),
-                mimetype='audio/mpeg',
-                as_attachment=False
-            )
+        if audio_file is None:
+            return jsonify({'error': 'Fichier audio non trouvé'}), 404
         
-        return jsonify({'error': 'Fichier audio non trouvé'}), 404
+        return send_media_file(
+            audio_file,
+            mimetype='audio/mpeg',
+            accel_prefix=app.config['ACCEL_AUDIO_PREFIX']
+        )
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -549,6 +1393,16 @@ def get_audio(file_id):
 # ROUTES GEMINI AI ASSISTANT
 # ============================================================================
 
+@app.route('/api/metadata/<file_id>')
+def get_metadata(file_id):
+    """Récupère les métadonnées du podcast généré pour un fichier."""
+    metadata = media_index.get_metadata(file_id) if media_index else None
+    
+    if metadata is None:
+        return jsonify({'error': 'Métadonnées non trouvées'}), 404
+    
+    return jsonify(metadata)
+
 @app.route('/api/ask', methods=['POST'])
 def ask_question():
     """
@@ -558,31 +1412,37 @@ def ask_question():
     {
         "question": "Qu'est-ce qu'un CNN ?",
         "level": "M2",  // Optionnel: M1 ou M2
-        "include_sources": true
+        "include_sources": true,
+        "socket_sid": "...",  // Optionnel: réponse streamée ('answer_chunk')
+        "stream_id": "..."  // Optionnel: identifiant repris dans les évènements
     }
     """
     if not gemini_assistant:
         return jsonify({'error': 'Assistant Gemini non disponible'}), 503
     
     try:
-        data = request.json
+        data = request.get_json(silent=True) or {}
         question = data.get('question')
         level = data.get('level')
         include_sources = data.get('include_sources', True)
+        stream_room = data.get('socket_sid')
+        stream_id = data.get('stream_id') or generate_unique_id()
         
         if not question:
             return jsonify({'error': 'Question requise'}), 400
         
-        print(f"❓ Question reçue : {question}")
+        logger.debug("❓ Question reçue : %s", question)
         
         # Obtenir la réponse avec références aux cours
-        result = gemini_assistant.answer_question(
+        result = answer_with_semantic_cache(
             question=question,
             level=level,
-            include_sources=include_sources
+            include_sources=include_sources,
+            stream_room=stream_room,
+            stream_id=stream_id
         )
         
-        print(f"✅ Réponse générée avec {len(result['sources'])} sources")
+        logger.debug("✅ Réponse générée avec %s sources", len(result['sources']))
         
         return jsonify({
             'success': True,
@@ -591,11 +1451,12 @@ def ask_question():
             'sources': result['sources'],
             'has_course_references': result['has_course_references'],
             'relevant_courses': result.get('relevant_courses', []),
+            'stream_id': stream_id,
             'timestamp': datetime.now().isoformat()
         })
     
     except Exception as e:
-        print(f"❌ Erreur : {e}")
+        logger.error("❌ Erreur : %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/chat', methods=['POST'])
@@ -607,7 +1468,7 @@ def chat_with_assistant():
         return jsonify({'error': 'Assistant Gemini non disponible'}), 503
     
     try:
-        data = request.json
+        data = request.get_json(silent=True) or {}
         message = data.get('message')
         conversation_id = data.get('conversation_id', generate_unique_id())
         
@@ -615,7 +1476,7 @@ def chat_with_assistant():
             return jsonify({'error': 'Message requis'}), 400
         
         # Pour l'instant, traiter comme une question simple
-        result = gemini_assistant.answer_question(
+        result = answer_with_semantic_cache(
             question=message,
             include_sources=True
         )
@@ -641,27 +1502,32 @@ def explain_topic():
     {
         "topic": "Réseaux de neurones convolutifs",
         "level": "M2",
-        "detail_level": "detailed"  // simple, detailed, expert
+        "detail_level": "detailed",  // simple, detailed, expert
+        "socket_sid": "...",  // Optionnel: explication streamée ('explanation_chunk')
+        "stream_id": "..."  // Optionnel: identifiant repris dans les évènements
     }
     """
     if not gemini_model:
         return jsonify({'error': 'Gemini API non configurée'}), 503
     
     try:
-        data = request.json
+        data = request.get_json(silent=True) or {}
         topic = data.get('topic')
         level = data.get('level')
         detail_level = data.get('detail_level', 'detailed')
+        stream_room = data.get('socket_sid')
+        stream_id = data.get('stream_id') or generate_unique_id()
         
         if not topic:
             return jsonify({'error': 'Topic requis'}), 400
         
-        print(f"📖 Explication demandée : {topic} (niveau: {detail_level})")
+        logger.debug("📖 Explication demandée : %s (niveau: %s)", topic, detail_level)
         
         # Chercher des cours pertinents
         relevant_courses = []
         if gemini_assistant:
-            relevant_chunks = gemini_assistant.find_relevant_chunks(
+            relevant_chunks = run_blocking(
+                gemini_assistant.find_relevant_chunks,
                 query=topic,
                 top_k=3,
                 level=level
@@ -672,75 +1538,52 @@ def explain_topic():
                 doc_id = chunk['doc_id']
                 if doc_id not in seen_docs:
                     relevant_courses.append({
+                        'doc_id': doc_id,
                         'title': chunk['title'],
                         'level': chunk['level'],
                         'category': chunk['category'],
-                        'content': chunk['content'][:500]
+                        'content': truncate_on_word(chunk['content'], 500)
                     })
                     seen_docs.add(doc_id)
         
-        # Construire le prompt selon le niveau de détail
-        detail_instructions = {
-            'simple': "Explique de manière simple et accessible, comme à un débutant. Utilise des analogies.",
-            'detailed': "Explique de manière détaillée avec des exemples concrets et des formules si nécessaire.",
-            'expert': "Explique de manière technique et approfondie, avec les détails mathématiques et les nuances importantes."
-        }
+        # Consignes selon le niveau de détail (défaut : détaillé)
+        instructions = DETAIL_INSTRUCTIONS.get(detail_level, DETAIL_INSTRUCTIONS['detailed'])
         
         if relevant_courses:
+            # Ordre stable (doc_id) pour un prompt identique entre requêtes proches
             context = "\n\n".join([
                 f"Extrait du cours '{course['title']}' ({course['level']}/{course['category']}):\n{course['content']}"
-                for course in relevant_courses
+                for course in sorted(relevant_courses, key=lambda c: c['doc_id'])
             ])
             
-            prompt = f"""Tu es un professeur expert en Data Science à l'université AMU.
-
-SUJET À EXPLIQUER: {topic}
-
-EXTRAITS DES COURS AMU PERTINENTS:
-{context}
-
-INSTRUCTIONS:
-{detail_instructions.get(detail_level, detail_instructions['detailed'])}
-
-Structure ta réponse ainsi:
-1. Définition : Qu'est-ce que c'est ?
-2. Principe de fonctionnement : Comment ça marche ?
-3. Applications : À quoi ça sert ?
-4. Exemples concrets
-5. Lien avec les cours AMU : Mentionne explicitement les cours pertinents
-
-EXPLICATION:"""
+            prompt = TOPIC_WITH_CONTEXT_PROMPT_TMPL.substitute(
+                topic=topic,
+                context=context,
+                instructions=instructions
+            )
         else:
-            prompt = f"""Tu es un professeur expert en Data Science.
-
-SUJET À EXPLIQUER: {topic}
-
-INSTRUCTIONS:
-{detail_instructions.get(detail_level, detail_instructions['detailed'])}
-
-Structure ta réponse ainsi:
-1. Définition : Qu'est-ce que c'est ?
-2. Principe de fonctionnement : Comment ça marche ?
-3. Applications : À quoi ça sert ?
-4. Exemples concrets
-
-Note: Ce sujet n'est pas directement couvert dans les cours AMU disponibles.
-
-EXPLICATION:"""
+            prompt = TOPIC_PROMPT_TMPL.substitute(topic=topic, instructions=instructions)
         
-        response = gemini_model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=2048
-            )
+        generation_config = genai.types.GenerationConfig(
+            temperature=0.7,
+            max_output_tokens=2048
         )
         
+        if stream_room:
+            explanation = generate_streamed_explanation(
+                prompt, generation_config, stream_room, stream_id=stream_id
+            )
+        else:
+            explanation = extract_gemini_response(
+                gemini_model.generate_content(prompt, generation_config=generation_config)
+            )
+        
         return jsonify({
             'success': True,
             'topic': topic,
             'detail_level': detail_level,
-            'explanation': extract_gemini_response(response),
+            'explanation': explanation,
+            'stream_id': stream_id,
             'relevant_courses': [
                 {'title': c['title'], 'level': c['level'], 'category': c['category']}
                 for c in relevant_courses
@@ -749,49 +1592,78 @@ EXPLICATION:"""
         })
     
     except Exception as e:
-        print(f"❌ Erreur : {e}")
+        logger.error("❌ Erreur : %s", e)
         return jsonify({'error': str(e)}), 500
 
 # ============================================================================
 # ROUTES GESTION DES COURS
 # ============================================================================
 
+def courses_etag():
+    """
+    Empreinte de la liste des cours : nombre de documents, date de la
+    dernière (ré)indexation et total des pages (une seule requête agrégée).
+    
+    Returns:
+        ETag ou None si la base n'est pas accessible par le pool
+    """
+    if not db_pool:
+        return None
+    
+    with db_pool.connection() as conn:
+        state = conn.execute(
+            'SELECT COUNT(*), MAX(indexed_at), TOTAL(page_count) FROM documents'
+        ).fetchone()
+    
+    return hashlib.sha1(repr(state).encode()).hexdigest()[:16]
+
 @app.route('/api/courses')
 def list_courses():
-    """Liste tous les cours indexés."""
+    """
+    Liste tous les cours indexés.
+    
+    La réponse JSON est streamée (les lignes sont lues d'abord, la connexion
+    rendue au pool, puis sérialisées au fil de l'envoi). Le
+    regroupement par niveau / catégorie est fait côté client (les cours
+    sont triés par niveau, catégorie puis nom de fichier).
+    
+    L'ETag est dérivé de l'état de la table documents : un client qui a
+    déjà la liste à jour reçoit un 304 sans que la liste soit relue.
+    """
     if not course_indexer:
         return jsonify({'error': 'Course indexer non disponible'}), 503
     
-    try:
-        documents = course_indexer.get_all_documents()
-        
-        # Organiser par niveau et catégorie
-        organized = {
-            'M1': {},
-            'M2': {}
-        }
+    etag = courses_etag()
+    if etag and request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    
+    documents = course_indexer.iter_documents()
+    
+    def generate(batch_size=64):
+        """Sérialise les cours au fil de la lecture, par lots de batch_size."""
+        yield '{"success":true,"courses":['
         
+        total = 0
+        batch = []
         for doc in documents:
-            level = doc['level']
-            category = doc['category']
-            
-            if level not in organized:
-                organized[level] = {}
-            
-            if category not in organized[level]:
-                organized[level][category] = []
-            
-            organized[level][category].append(doc)
+            batch.append(app.json.dumps(doc))
+            total += 1
+            if len(batch) == batch_size:
+                yield (',' if total > batch_size else '') + ','.join(batch)
+                batch = []
         
-        return jsonify({
-            'success': True,
-            'total_courses': len(documents),
-            'courses': documents,
-            'organized': organized
-        })
+        if batch:
+            yield (',' if total > len(batch) else '') + ','.join(batch)
+        
+        # Le total n'est connu qu'à la fin du parcours
+        yield f'],"total_courses":{total}}}'
     
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    response = Response(stream_with_context(generate()), mimetype='application/json')
+    if etag:
+        response.set_etag(etag)
+    return response
 
 @app.route('/api/courses/search', methods=['POST'])
 def search_courses():
@@ -809,7 +1681,7 @@ def search_courses():
         return jsonify({'error': 'Course indexer non disponible'}), 503
     
     try:
-        data = request.json
+        data = request.get_json(silent=True) or {}
         query = data.get('query')
         level = data.get('level')
         category = data.get('category')
@@ -837,6 +1709,88 @@ def search_courses():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Une ligne par chunk (5 premiers) ; une seule ligne avec chunk NULL si le
+# document n'a pas de chunks. L'aperçu (300 caractères, '...' si le contenu
+# est plus long) est construit par SQLite sans lire le reste du contenu
+SQL_COURSE_DETAILS = '''
+SELECT d.doc_id, d.file_path, d.level, d.category, d.filename,
+       d.extracted_title, d.page_count, d.indexed_at,
+       m.keywords, m.topics, m.difficulty_level, m.estimated_duration_min,
+       c.chunk_id, c.preview, c.page_number
+FROM documents d
+LEFT JOIN document_metadata m ON d.doc_id = m.doc_id
+LEFT JOIN (
+    SELECT chunk_id, page_number, chunk_index,
+           substr(content, 1, 300) ||
+           CASE WHEN substr(content, 301, 1) != '' THEN '...' ELSE '' END AS preview
+    FROM document_chunks
+    WHERE doc_id = ?
+    ORDER BY chunk_index
+    LIMIT 5
+) c ON 1
+WHERE d.doc_id = ?
+ORDER BY c.chunk_index
+'''
+
+class CourseNotFoundError(LookupError):
+    """Cours absent de la base (levée plutôt que retournée : non mise en cache)."""
+
+@lru_cache(maxsize=1024)
+def load_course_details(doc_id):
+    """
+    Construit la réponse JSON (déjà sérialisée) des détails d'un cours.
+    
+    Les détails ne changent qu'à la réindexation, qui vide ce cache. Un
+    doc_id inconnu lève une exception : lru_cache ne la garde pas, le cours
+    est trouvé dès qu'il est indexé et les identifiants invalides
+    n'occupent pas le cache.
+    
+    Returns:
+        Corps de la réponse en bytes
+    
+    Raises:
+        CourseNotFoundError: Si le cours n'existe pas
+    """
+    # Document, métadonnées et premiers chunks en une seule requête
+    # (curseur en sqlite3.Row : la connexion du pool reste en tuples)
+    with read_connection('database/amu_courses.db', db_pool) as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        rows = cursor.execute(SQL_COURSE_DETAILS, (doc_id, doc_id)).fetchall()
+    
+    if not rows:
+        raise CourseNotFoundError(doc_id)
+    
+    row = rows[0]
+    
+    course_details = {
+        'doc_id': row['doc_id'],
+        'file_path': row['file_path'],
+        'level': row['level'],
+        'category': row['category'],
+        'filename': row['filename'],
+        'title': row['extracted_title'],
+        'page_count': row['page_count'],
+        'indexed_at': row['indexed_at'],
+        'keywords': row['keywords'].split(',') if row['keywords'] else [],
+        'topics': row['topics'].split(',') if row['topics'] else [],
+        'difficulty': row['difficulty_level'],
+        'estimated_duration_min': row['estimated_duration_min'],
+        'content_preview': [
+            {
+                'chunk_id': r['chunk_id'],
+                'content': r['preview'],
+                'page': r['page_number']
+            }
+            for r in rows if r['chunk_id'] is not None
+        ]
+    }
+    
+    return app.json.dumps({
+        'success': True,
+        'course': course_details
+    }).encode()
+
 @app.route('/api/courses/<doc_id>')
 def get_course_details(doc_id):
     """Récupère les détails d'un cours spécifique."""
@@ -844,66 +1798,11 @@ def get_course_details(doc_id):
         return jsonify({'error': 'Course indexer non disponible'}), 503
     
     try:
-        import sqlite3
-        
-        conn = sqlite3.connect('database/amu_courses.db')
-        cursor = conn.cursor()
-        
-        # Récupérer les informations du document
-        cursor.execute('''
-        SELECT d.doc_id, d.file_path, d.level, d.category, d.filename,
-               d.extracted_title, d.page_count, d.indexed_at,
-               m.keywords, m.topics, m.difficulty_level, m.estimated_duration_min
-        FROM documents d
-        LEFT JOIN document_metadata m ON d.doc_id = m.doc_id
-        WHERE d.doc_id = ?
-        ''', (doc_id,))
-        
-        row = cursor.fetchone()
-        
-        if not row:
-            conn.close()
-            return jsonify({'error': 'Cours non trouvé'}), 404
-        
-        # Récupérer les chunks
-        cursor.execute('''
-        SELECT chunk_id, content, page_number
-        FROM document_chunks
-        WHERE doc_id = ?
-        ORDER BY chunk_index
-        LIMIT 5
-        ''', (doc_id,))
-        
-        chunks = cursor.fetchall()
-        conn.close()
-        
-        course_details = {
-            'doc_id': row[0],
-            'file_path': row[1],
-            'level': row[2],
-            'category': row[3],
-            'filename': row[4],
-            'title': row[5],
-            'page_count': row[6],
-            'indexed_at': row[7],
-            'keywords': row[8].split(',') if row[8] else [],
-            'topics': row[9].split(',') if row[9] else [],
-            'difficulty': row[10],
-            'estimated_duration_min': row[11],
-            'content_preview': [
-                {
-                    'chunk_id': chunk[0],
-                    'content': chunk[1][:300] + '...' if len(chunk[1]) > 300 else chunk[1],
-                    'page': chunk[2]
-                }
-                for chunk in chunks
-            ]
-        }
-        
-        return jsonify({
-            'success': True,
-            'course': course_details
-        })
+        payload = load_course_details(doc_id)
+        return Response(payload, mimetype='application/json')
+    
+    except CourseNotFoundError:
+        return jsonify({'error': 'Cours non trouvé'}), 404
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -912,35 +1811,22 @@ def get_course_details(doc_id):
 def download_course(doc_id):
     """Télécharge le PDF d'un cours."""
     try:
-        import sqlite3
-        
-        conn = sqlite3.connect('database/amu_courses.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        SELECT file_path, filename
-        FROM documents
-        WHERE doc_id = ?
-        ''', (doc_id,))
-        
-        row = cursor.fetchone()
-        conn.close()
+        with read_connection('database/amu_courses.db', db_pool) as conn:
+            row = conn.execute('''
+            SELECT file_path, filename
+            FROM documents
+            WHERE doc_id = ?
+            ''', (doc_id,)).fetchone()
         
         if not row:
-            print(f"❌ Cours non trouvé : {doc_id}")
+            logger.warning("❌ Cours non trouvé : %s", doc_id)
             return jsonify({'error': 'Cours non trouvé'}), 404
         
         # Récupérer le chemin et le nom du fichier
         file_path_str = row[0]
         filename = row[1]
         
-        print(f"\n{'='*60}")
-        print(f"🔍 DEBUG TÉLÉCHARGEMENT")
-        print(f"{'='*60}")
-        print(f"doc_id: {doc_id}")
-        print(f"file_path (DB): {file_path_str}")
-        print(f"filename (DB): {filename}")
-        print(f"Current working dir: {os.getcwd()}")
+        logger.debug("🔍 Téléchargement %s : file_path=%s filename=%s", doc_id, file_path_str, filename)
         
         # Essayer plusieurs chemins possibles
         possible_paths = []
@@ -953,57 +1839,43 @@ def download_course(doc_id):
         possible_paths.append(Path('data/course_materials') / filename)
         
         # 3. Chemin depuis .env
-        course_materials_path = os.getenv('COURSE_MATERIALS_PATH', 'data/course_materials')
-        possible_paths.append(Path(course_materials_path) / filename)
-        
-        # 4. Chercher dans tous les sous-dossiers de data/course_materials
-        course_materials_dir = Path('data/course_materials')
-        if course_materials_dir.exists():
-            for pdf_file in course_materials_dir.rglob(filename):
-                possible_paths.append(pdf_file)
-                break
-        
-        # Trouver le premier chemin qui existe
-        file_path = None
-        for i, path in enumerate(possible_paths, 1):
-            abs_path = path.absolute()
-            print(f"Essai {i}: {abs_path}")
-            print(f"  Existe: {path.exists()}")
-            if path.exists() and path.is_file():
-                file_path = path
-                print(f"  ✅ Trouvé !")
-                break
-        
-        print(f"{'='*60}\n")
+        possible_paths.append(COURSE_MATERIALS_DIR / filename)
+        
+        # 4. Chercher le nom de fichier dans l'index des PDF
+        indexed_path = pdf_path_index.get(filename)
+        if indexed_path:
+            possible_paths.append(indexed_path)
+        
+        # Trouver le premier chemin qui existe (chemins en double testés une fois)
+        possible_paths = list(dict.fromkeys(possible_paths))
+        file_path = next((path for path in possible_paths if is_regular_file(path)), None)
         
         if not file_path:
-            # Lister les fichiers disponibles dans data/course_materials pour debug
-            if course_materials_dir.exists():
-                print(f"📁 Fichiers PDF dans {course_materials_dir.absolute()}:")
-                for f in list(course_materials_dir.rglob('*.pdf'))[:10]:
-                    print(f"  - {f.name}")
+            # Lister quelques PDF disponibles (diagnostic, niveau DEBUG uniquement)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "📁 PDF indexés (extrait) : %s",
+                    ', '.join(list(pdf_path_index)[:10])
+                )
             
             return jsonify({
                 'error': 'Fichier PDF introuvable',
                 'file_path_in_db': file_path_str,
                 'filename': filename,
-                'paths_tested': [str(p.absolute()) for p in possible_paths],
-                'current_dir': os.getcwd()
+                'paths_tested': [os.path.abspath(p) for p in possible_paths],
+                'current_dir': CURRENT_DIR
             }), 404
         
-        print(f"✅ Téléchargement de : {file_path.absolute()}")
-        
-        return send_file(
-            str(file_path.absolute()),
+        return send_media_file(
+            file_path,
             mimetype='application/pdf',
-            as_attachment=True,
+            accel_prefix=app.config['ACCEL_PDF_PREFIX'],
+            accel_root=COURSE_MATERIALS_DIR,
             download_name=filename
         )
     
     except Exception as e:
-        import traceback
-        print(f"❌ Erreur lors du téléchargement :")
-        traceback.print_exc()
+        logger.exception("❌ Erreur lors du téléchargement : %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/courses/reindex', methods=['POST'])
@@ -1013,23 +1885,25 @@ def reindex_courses():
         return jsonify({'error': 'Course indexer non disponible'}), 503
     
     try:
-        print("🔄 Début de la réindexation...")
+        logger.info("🔄 Début de la réindexation...")
+        # Extraction hors transaction, une transaction courte par document
         stats = course_indexer.scan_and_index_all()
         
+        # Les PDF ont pu être ajoutés, déplacés ou supprimés
+        global pdf_path_index
+        pdf_path_index = build_pdf_path_index()
+        load_course_details.cache_clear()
+        
         # Recréer le cache d'embeddings
         if gemini_assistant:
-            print("🔄 Recréation du cache d'embeddings...")
+            logger.info("🔄 Recréation du cache d'embeddings...")
             gemini_assistant._create_embeddings_cache()
-            
-            # Sauvegarder le cache
-            import numpy as np
-            cache_path = Path('database/embeddings_cache.npz')
-            np.savez(
-                cache_path,
-                embeddings=gemini_assistant.chunk_embeddings,
-                chunk_data=np.array(gemini_assistant.chunk_data, dtype=object)
-            )
-            print("✅ Cache d'embeddings sauvegardé")
+            gemini_assistant.save_embeddings_cache()
+            logger.info("✅ Cache d'embeddings sauvegardé")
+        
+        # Les réponses en cache peuvent citer des cours obsolètes
+        if semantic_cache:
+            semantic_cache.clear()
         
         return jsonify({
             'success': True,
@@ -1038,7 +1912,7 @@ def reindex_courses():
         })
     
     except Exception as e:
-        print(f"❌ Erreur réindexation : {e}")
+        logger.error("❌ Erreur réindexation : %s", e)
         return jsonify({'error': str(e)}), 500
 
 # ============================================================================
@@ -1094,7 +1968,7 @@ def generate_custom_quiz():
         return jsonify({'error': 'Assistant Gemini non disponible'}), 503
     
     try:
-        data = request.json
+        data = request.get_json(silent=True) or {}
         topic = data.get('topic')
         level = data.get('level')
         num_questions = data.get('num_questions', 5)
@@ -1104,7 +1978,8 @@ def generate_custom_quiz():
             return jsonify({'error': 'Topic requis'}), 400
         
         # Trouver les chunks pertinents
-        relevant_chunks = gemini_assistant.find_relevant_chunks(
+        relevant_chunks = run_blocking(
+            gemini_assistant.find_relevant_chunks,
             query=topic,
             top_k=3,
             level=level
@@ -1148,55 +2023,35 @@ def generate_quiz_from_upload(file_id):
         return jsonify({'error': 'Gemini API non configurée'}), 503
     
     try:
-        data = request.json or {}
+        data = request.get_json(silent=True) or {}
         num_questions = data.get('num_questions', 5)
         difficulty = data.get('difficulty', 'intermediate')
         
         # Récupérer le fichier
-        upload_folder = Path(app.config['UPLOAD_FOLDER'])
-        file_path = None
-        
-        for file in upload_folder.glob(f"{file_id}_*"):
-            file_path = file
-            break
+        file_path = find_upload_path(file_id)
         
         if not file_path:
             return jsonify({'error': 'Fichier non trouvé'}), 404
         
         # Extraire le texte
         if document_processor:
-            text = document_processor.process_document(str(file_path))
+            text = extract_document_text(file_id, file_path)
         else:
             return jsonify({'error': 'Document processor non disponible'}), 500
         
         # Générer le quiz avec Gemini
-        quiz_prompt = f"""Génère {num_questions} questions à choix multiples basées sur ce contenu.
-Difficulté: {difficulty}
-
-CONTENU:
-{text[:3000]}
-
-Format JSON strict (sans texte supplémentaire):
-[
-  {{
-    "question": "Question claire et précise",
-    "options": ["Option A", "Option B", "Option C", "Option D"],
-    "correct_answer": "Option correcte",
-    "explanation": "Explication détaillée",
-    "difficulty": "{difficulty}"
-  }}
-]"""
+        quiz_prompt = QUIZ_PROMPT_TMPL.substitute(
+            num_questions=num_questions,
+            difficulty=difficulty,
+            text=text[:3000]
+        )
         
         response = gemini_model.generate_content(quiz_prompt)
         response_text = extract_gemini_response(response)
         
         # Parser le JSON
-        import json
-        import re
-        
-        json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-        if json_match:
-            quiz = json.loads(json_match.group())
+        quiz = parse_json_array(response_text)
+        if quiz is not None:
             return jsonify({
                 'success': True,
                 'file_id': file_id,
@@ -1220,34 +2075,37 @@ def create_mobile_session():
         return jsonify({'error': 'Services mobiles non disponibles'}), 503
     
     try:
-        data = request.json or {}
+        data = request.get_json(silent=True) or {}
         user_id = data.get('user_id', 'anonymous')
         device_info = data.get('device_info', {})
         
         # Créer la session
         session_id = sync_manager.create_session(user_id, device_info)
         
-        # Obtenir l'IP locale
-        local_ip = get_local_ip()
-        base_url = f"http://{local_ip}:5000"
+        # IP locale et URL de base calculées au démarrage
+        local_ip = app.config['LOCAL_IP']
+        base_url = app.config['BASE_URL']
         
-        print(f"📱 Génération QR Code - IP locale: {local_ip}")
-        print(f"📱 Base URL: {base_url}")
+        logger.debug("📱 Génération QR Code - Base URL: %s", base_url)
         
-        # Générer le QR code
-        qr_path = qr_generator.generate_session_qr(session_id, base_url)
+        # Générer le QR code en arrière-plan (PNG servi dès qu'il est prêt)
+        qr_filename = f"session_{session_id[:8]}.png"
+        future = qr_executor.submit(
+            run_blocking, qr_generator.generate_session_qr, session_id, base_url, qr_filename
+        )
+        pending_qr_codes[qr_filename] = future
+        future.add_done_callback(lambda _: pending_qr_codes.pop(qr_filename, None))
         
         return jsonify({
             'success': True,
             'session_id': session_id,
-            'qr_code_url': f'/static/qr_codes/{os.path.basename(qr_path)}',
+            'qr_code_url': f'/static/qr_codes/{qr_filename}',
             'join_url': f'{base_url}/mobile/join?session={session_id}',
             'local_ip': local_ip
         })
     
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Erreur création de session mobile : %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/mobile/join')
@@ -1270,23 +2128,28 @@ def join_session():
 
 @app.route('/mobile/sync-position', methods=['POST'])
 def sync_audio_position():
-    """Synchronise la position de lecture audio."""
+    """
+    Synchronise la position de lecture audio.
+    
+    Obsolète : les clients envoient désormais la position avec l'événement
+    Socket.IO 'audio_control' (pas de requête HTTP à chaque déplacement).
+    """
     if not sync_manager:
         return jsonify({'error': 'Service mobile non disponible'}), 503
     
     try:
-        data = request.json
+        data = request.get_json(silent=True) or {}
         session_id = data.get('session_id')
         position = data.get('position', 0)
         
         sync_manager.sync_audio_position(session_id, position)
         
         # Notifier les autres appareils via WebSocket
-        socketio.emit('audio_sync', {
-            'position': position
-        }, room=session_id)
+        socketio.emit('audio_sync', audio_sync_payload(session_id, None, position), room=session_id)
         
-        return jsonify({'success': True})
+        response = jsonify({'success': True})
+        response.headers['Deprecation'] = 'true'
+        return response
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1318,13 +2181,13 @@ def get_session_state(session_id):
 @socketio.on('connect')
 def handle_connect():
     """Gère la connexion WebSocket."""
-    print(f"✅ Client connecté: {request.sid}")
+    logger.debug("✅ Client connecté: %s", request.sid)
     emit('connected', {'message': 'Connexion établie', 'sid': request.sid})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Gère la déconnexion WebSocket."""
-    print(f"❌ Client déconnecté: {request.sid}")
+    logger.debug("❌ Client déconnecté: %s", request.sid)
 
 @socketio.on('join_session')
 def handle_join_session(data):
@@ -1337,7 +2200,7 @@ def handle_join_session(data):
     
     join_room(session_id)
     
-    print(f"📱 Client {request.sid} a rejoint la session {session_id}")
+    logger.debug("📱 Client %s a rejoint la session %s", request.sid, session_id)
     
     emit('session_joined', {
         'message': 'Connecté à la session',
@@ -1361,7 +2224,7 @@ def handle_leave_session(data):
     
     leave_room(session_id)
     
-    print(f"📱 Client {request.sid} a quitté la session {session_id}")
+    logger.debug("📱 Client %s a quitté la session %s", request.sid, session_id)
     
     # Notifier les autres participants
     emit('user_left', {
@@ -1386,6 +2249,31 @@ def handle_quiz_answer(data):
         'timestamp': datetime.now().isoformat()
     }, room=session_id)
 
+def audio_sync_payload(session_id, action, position):
+    """
+    Construit le paquet 'audio_sync' diffusé aux appareils d'une session.
+    
+    En msgpack, le paquet est compact : action codée en entier ('a', -1 si
+    inconnue), position en millisecondes ('p') et horodatage en millisecondes
+    depuis le début de la session ('t'), sans date ISO à formater ni à parser.
+    """
+    if SOCKETIO_SERIALIZER != 'msgpack':
+        payload = {'position': position, 'timestamp': datetime.now().isoformat()}
+        if action is not None:
+            payload['action'] = action
+        return payload
+    
+    try:
+        position_ms = int(float(position) * 1000)
+    except (TypeError, ValueError):
+        position_ms = 0
+    
+    return {
+        'a': AUDIO_ACTION_CODES.get(action, -1),
+        'p': position_ms,
+        't': sync_manager.elapsed_ms(session_id) if sync_manager else 0
+    }
+
 @socketio.on('audio_control')
 def handle_audio_control(data):
     """Synchronise les contrôles audio entre appareils."""
@@ -1393,14 +2281,23 @@ def handle_audio_control(data):
     action = data.get('action')  # play, pause, seek
     position = data.get('position', 0)
     
-    print(f"🎵 Audio control: {action} @ {position}s (session: {session_id})")
+    logger.debug("🎵 Audio control: %s @ %ss (session: %s)", action, position, session_id)
+    
+    # Sans session, aucun autre appareil à synchroniser
+    if not session_id:
+        return
+    
+    # Position enregistrée ici : plus besoin d'appeler /mobile/sync-position
+    if sync_manager:
+        sync_manager.sync_audio_position(session_id, position)
     
     # Diffuser à tous les appareils de la session sauf l'émetteur
-    emit('audio_sync', {
-        'action': action,
-        'position': position,
-        'timestamp': datetime.now().isoformat()
-    }, room=session_id, include_self=False)
+    emit(
+        'audio_sync',
+        audio_sync_payload(session_id, action, position),
+        to=session_id,
+        include_self=False
+    )
 
 # ============================================================================
 # ROUTES STATIQUES
@@ -1408,8 +2305,15 @@ def handle_audio_control(data):
 
 @app.route('/static/qr_codes/<filename>')
 def serve_qr_code(filename):
-    """Sert les QR codes générés."""
-    return send_from_directory('mobile/static/qr_codes', filename)
+    """Sert les QR codes générés (en attendant la fin de leur génération)."""
+    future = pending_qr_codes.get(filename)
+    if future is not None:
+        try:
+            future.result(timeout=5)
+        except Exception as e:
+            logger.error("❌ Erreur génération QR code %s : %s", filename, e)
+    
+    return send_from_directory(QR_DIR, filename)
 
 # ============================================================================
 # GESTION DES ERREURS
@@ -1430,29 +2334,30 @@ def internal_error(error):
 # ============================================================================
 
 if __name__ == '__main__':
-    local_ip = get_local_ip()
-    
-    print("\n" + "="*70)
-    print("🚀 DÉMARRAGE DE L'APPLICATION AMU DATA SCIENCE")
-    print("="*70)
-    print(f"📍 URL locale: http://127.0.0.1:5000")
-    print(f"📍 URL réseau: http://{local_ip}:5000")
-    print(f"📱 API: http://{local_ip}:5000/api/")
-    print(f"🤖 Gemini Model: {'✅ Actif' if gemini_model else '❌ Inactif'}")
-    print(f"🤖 Gemini Assistant: {'✅ Actif' if gemini_assistant else '❌ Actif'}")
-    print(f"📚 Course Indexer: {'✅ Actif' if course_indexer else '❌ Inactif'}")
-    print(f"📱 Mobile Sync: {'✅ Actif' if sync_manager else '❌ Inactif'}")
-    print("="*70)
-    print("\n📋 ENDPOINTS PRINCIPAUX:")
-    print("  POST /api/upload-and-explain - Upload + Explication Gemini")
-    print("  POST /api/ask - Poser une question")
-    print("  POST /api/explain-topic - Expliquer un sujet")
-    print("  GET  /api/courses - Lister les cours")
-    print("  GET  /api/courses/<doc_id>/download - Télécharger un PDF")
-    print("  POST /api/quiz/from-upload/<file_id> - Quiz depuis upload")
-    print("="*70)
-    print(f"\n📱 Pour accès mobile, scannez le QR code généré avec l'IP: {local_ip}")
-    print("="*70 + "\n")
+    local_ip = app.config['LOCAL_IP']
+    
+    logger.info("\n" + "="*70)
+    logger.info("🚀 DÉMARRAGE DE L'APPLICATION AMU DATA SCIENCE")
+    logger.info("="*70)
+    logger.info("📍 URL locale: http://127.0.0.1:5000")
+    logger.info("📍 URL réseau: %s", app.config['BASE_URL'])
+    logger.info("📱 API: %s/api/", app.config['BASE_URL'])
+    logger.info("🤖 Gemini Model: %s", '✅ Actif' if gemini_model else '❌ Inactif')
+    logger.info("🤖 Gemini Assistant: %s", '✅ Actif' if gemini_assistant else '❌ Actif')
+    logger.info("📚 Course Indexer: %s", '✅ Actif' if course_indexer else '❌ Inactif')
+    logger.info("📱 Mobile Sync: %s", '✅ Actif' if sync_manager else '❌ Inactif')
+    logger.info("⚡ Mode SocketIO: %s", SOCKETIO_ASYNC_MODE)
+    logger.info("="*70)
+    logger.info("\n📋 ENDPOINTS PRINCIPAUX:")
+    logger.info("  POST /api/upload-and-explain - Upload + Explication Gemini")
+    logger.info("  POST /api/ask - Poser une question")
+    logger.info("  POST /api/explain-topic - Expliquer un sujet")
+    logger.info("  GET  /api/courses - Lister les cours")
+    logger.info("  GET  /api/courses/<doc_id>/download - Télécharger un PDF")
+    logger.info("  POST /api/quiz/from-upload/<file_id> - Quiz depuis upload")
+    logger.info("="*70)
+    logger.info("\n📱 Pour accès mobile, scannez le QR code généré avec l'IP: %s", local_ip)
+    logger.info("="*70 + "\n")
     
     # Lancer l'application
     socketio.run(
@@ -1460,6 +2365,7 @@ if __name__ == '__main__':
         debug=True,
         host='0.0.0.0',
         port=5000,
-        allow_unsafe_werkzeug=True,
+        # Seul le mode threading passe par le serveur de développement Werkzeug
+        allow_unsafe_werkzeug=SOCKETIO_ASYNC_MODE == 'threading',
         use_reloader=False
     )
@@ -1,6 +1,5 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.stats import poisson
 
 # Paramètre de la loi de Poisson
 lambda_ = 1.5  # λ = 1
@@ -8,8 +7,12 @@ lambda_ = 1.5  # λ = 1
 # Création des valeurs possibles de k (nombre d'enfants vivants)
 k_values = np.arange(0, 11)  # De 0 à 10 enfants
 
-# Calcul des probabilités P(X=k)
-probabilities = poisson.pmf(k_values, lambda_)
+# Calcul des probabilités P(X=k) par récurrence :
+# P(X=0) = e^(-λ), puis P(X=k) = P(X=k-1) * λ / k
+probabilities = np.empty(len(k_values))
+probabilities[0] = np.exp(-lambda_)
+probabilities[1:] = lambda_ / k_values[1:]
+np.cumprod(probabilities, out=probabilities)
 
 # Tracé du graphe
 plt.figure(figsize=(10, 6))
@@ -4,9 +4,19 @@ import requests
 import pandas as pd
 import os
 import csv
+import tempfile
+import threading
+import time
 
 app = FastAPI(title="INSEE Births API")
 
+# Durée de validité du DataFrame INSEE en mémoire (données mensuelles)
+CACHE_TTL = 24 * 3600
+
+# Délai avant l'écriture du CSV après une mise à jour (les mises à jour
+# rapprochées ne coûtent qu'une seule réécriture)
+CSV_FLUSH_DELAY = 1.0
+
 class ApiHandler:
     def __init__(self):
         self.url = "https://api.insee.fr/melodi/data/DS_EC_NAIS"
@@ -18,6 +28,10 @@ class ApiHandler:
             "EC_MEASURE": "LVB",
             "GEO": "DEP"
         }
+        self._df = None
+        self._df_by_dep = {}
+        self._df_time = 0.0
+        self._df_lock = threading.Lock()
 
     def get_data_from_api_insee(self):
         """Récupère les données JSON depuis l'API INSEE"""
@@ -30,35 +44,49 @@ class ApiHandler:
         if data is None:
             data = self.get_data_from_api_insee()
 
-        observations = data["observations"]
-        df = pd.DataFrame({
-            "departement": [obs["dimensions"]["GEO"].split("DEP-")[1] for obs in observations],
-            "period": [obs["dimensions"]["TIME_PERIOD"] for obs in observations],
-            "births": [obs["measures"]["OBS_VALUE_NIVEAU"]["value"] for obs in observations]
-        })
-        df["period"] = pd.to_datetime(df["period"], format="%Y-%m")  
+        # Aplatissement des observations en une seule passe
+        df = pd.json_normalize(data["observations"]).reindex(
+            columns=["dimensions.GEO", "dimensions.TIME_PERIOD", "measures.OBS_VALUE_NIVEAU.value"]
+        )
+        df.columns = ["departement", "period", "births"]
+        df["departement"] = df["departement"].str.removeprefix("DEP-")
+        df["period"] = pd.to_datetime(df["period"], format="%Y-%m", cache=True)
         df = df.sort_values(by=["departement", "period"]).reset_index(drop=True)
         return df
 
+    def get_df(self):
+        """Retourne le DataFrame INSEE, récupéré à nouveau seulement après CACHE_TTL secondes"""
+        with self._df_lock:
+            if self._df is None or time.time() - self._df_time > CACHE_TTL:
+                df = self.create_df_from_api_insee()
+                self._df_by_dep = dict(tuple(df.groupby("departement", sort=False)))
+                self._df = df
+                self._df_time = time.time()
+            return self._df
+
+    def _get_df_dep(self, dep, df=None):
+        """Retourne les lignes d'un département (groupes précalculés pour le DataFrame en cache)"""
+        if df is not None:
+            return df[df["departement"] == dep]
+        df = self.get_df()
+        return self._df_by_dep.get(dep, df.iloc[:0])
+
     def get_departments(self, df=None):
         """Retourne la liste des départements"""
         if df is None:
-            df = self.create_df_from_api_insee()
+            df = self.get_df()
         return df["departement"].unique().tolist()
 
     def get_births_by_department(self, dep, df=None):
         """Retourne les naissances pour un département"""
-        if df is None:
-            df = self.create_df_from_api_insee()
-        df_dep = df[df["departement"] == dep]
+        df_dep = self._get_df_dep(dep, df)
         result = df_dep.to_dict(orient="records")
         return result
 
     def get_births_by_department_and_month(self, dep, month, df=None):
         """Retourne les naissances pour un département et un mois donné"""
-        if df is None:
-            df = self.create_df_from_api_insee()
-        df_filtered = df[(df["departement"] == dep) & (df["period"] == month)]
+        df_dep = self._get_df_dep(dep, df)
+        df_filtered = df_dep[df_dep["period"] == month]
         if df_filtered.empty:
             raise HTTPException(status_code=404, detail="Données non trouvées")
         return df_filtered.iloc[0].to_dict()
@@ -87,50 +115,121 @@ def births_by_department_and_month(dep: str, month: str):
     return api_handler.get_births_by_department_and_month(dep, month)
 
 
+class DepartmentStore:
+    """Départements du fichier CSV, lus une seule fois puis gardés en mémoire"""
+
+    fieldnames = ["department", "checked"]
+
+    def __init__(self, file_path, flush_delay=CSV_FLUSH_DELAY):
+        self.file_path = file_path
+        self.flush_delay = flush_delay
+        self._rows = None  # département -> checked, dans l'ordre du fichier
+        self._lock = threading.Lock()
+        self._flush_timer = None  # Écriture du CSV programmée, s'il y en a une
+
+    def _get_rows(self):
+        """Retourne les lignes en mémoire (relit le CSV au premier accès)"""
+        if self._rows is None:
+            with open(self.file_path, mode="r", newline="") as f:
+                self._rows = {row["department"]: row["checked"] for row in csv.DictReader(f)}
+        return self._rows
+
+    def insert(self, dep):
+        """Ajoute un département (checked=0) en fin de fichier ; False s'il existe déjà"""
+        with self._lock:
+            new_file = not os.path.exists(self.file_path)
+            if new_file:
+                os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+                self._rows = {}
+
+            rows = self._get_rows()
+            if dep in rows:
+                return False
+
+            with open(self.file_path, mode="a", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=self.fieldnames)
+                if new_file:
+                    writer.writeheader()
+                writer.writerow({"department": dep, "checked": "0"})
+
+            rows[dep] = "0"
+            return True
+
+    def update(self, dep):
+        """Passe checked à 1 pour un département ; False s'il est absent du fichier"""
+        with self._lock:
+            if not os.path.exists(self.file_path):
+                self._rows = None
+                raise FileNotFoundError(self.file_path)
+
+            rows = self._get_rows()
+            if dep not in rows:
+                return False
+
+            if rows[dep] != "1":
+                rows[dep] = "1"
+                self._schedule_flush()
+            return True
+
+    def _schedule_flush(self):
+        """Programme l'écriture du CSV (verrou déjà pris)"""
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """
+        Réécrit le CSV depuis la mémoire : fichier temporaire dans le même
+        dossier puis os.replace, le CSV n'est jamais laissé tronqué
+        """
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            else:
+                return
+            if self._rows is None:
+                return
+
+            directory = os.path.dirname(self.file_path) or "."
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, mode="w", newline="") as f:
+                    writer = csv.writer(f)
+                    writer.writerow(self.fieldnames)
+                    writer.writerows(self._rows.items())
+                os.replace(tmp_path, self.file_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+
+department_store = DepartmentStore("data/departments.csv")
+
+
+@app.on_event("shutdown")
+def flush_departments():
+    # Mises à jour encore en attente d'écriture
+    department_store.flush()
+
+
 @app.post("/insert/{dep}")
 def insert_department(dep: str):
-    file_path = "data/departments.csv"
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-    rows = []
-    if os.path.exists(file_path):
-        with open(file_path, mode="r", newline="") as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
-            if any(row["department"] == dep for row in rows):
-                return {"message": "Le département existe déjà"}
-
-    rows.append({"department": dep, "checked": "0"})
-    with open(file_path, mode="w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["department", "checked"])
-        writer.writeheader()
-        writer.writerows(rows)
+    if not department_store.insert(dep):
+        return {"message": "Le département existe déjà"}
 
     return {"message": f"Département {dep} inséré avec checked=0"}
 
 
 @app.post("/update/{dep}")
 def update_department(dep: str):
-    file_path = "data/departments.csv"
-    if not os.path.exists(file_path):
+    try:
+        updated = department_store.update(dep)
+    except FileNotFoundError:
         raise HTTPException(status_code=500, detail="Fichier CSV non trouvé")
 
-    updated = False
-    rows = []
-    with open(file_path, mode="r", newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row["department"] == dep:
-                row["checked"] = "1"
-                updated = True
-            rows.append(row)
-
     if not updated:
         raise HTTPException(status_code=500, detail=f"Département {dep} non trouvé dans le fichier CSV")
 
-    with open(file_path, mode="w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["department", "checked"])
-        writer.writeheader()
-        writer.writerows(rows)
-
     return {"message": f"Département {dep} mis à jour avec checked=1"}
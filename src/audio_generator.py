@@ -1,10 +1,30 @@
 from gtts import gTTS
-from pydub import AudioSegment
 import os
 import tempfile
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, TYPE_CHECKING
 from datetime import datetime
 
+if TYPE_CHECKING:
+    from pydub import AudioSegment
+
+
+def _audio_segment():
+    """
+    Importe pydub à la première génération audio : le module (et sa
+    recherche de ffmpeg) n'est pas chargé au démarrage de l'application.
+    """
+    from pydub import AudioSegment
+    return AudioSegment
+
+
+# Sections du script, dans l'ordre du podcast
+SCRIPT_SECTIONS = (
+    ('intro', "Intro générée"),
+    ('main_content', "Contenu principal généré"),
+    ('conclusion', "Conclusion générée")
+)
+
 
 class AudioGenerator:
     """Génère l'audio final du podcast"""
@@ -39,25 +59,20 @@ class AudioGenerator:
         """
         print(" Génération de l'audio...")
         
+        sections = [(key, label) for key, label in SCRIPT_SECTIONS if script.get(key)]
         audio_segments = []
         
-        # 1. Introduction
-        if script.get('intro'):
-            intro_audio = self._text_to_speech(script['intro'])
-            audio_segments.append(intro_audio)
-            print("    Intro générée")
-        
-        # 2. Contenu principal
-        if script.get('main_content'):
-            main_audio = self._text_to_speech(script['main_content'])
-            audio_segments.append(main_audio)
-            print("   Contenu principal généré")
-        
-        # 3. Conclusion
-        if script.get('conclusion'):
-            conclusion_audio = self._text_to_speech(script['conclusion'])
-            audio_segments.append(conclusion_audio)
-            print("   Conclusion générée")
+        # Synthèse des sections en parallèle (appels réseau gTTS) ;
+        # map() rend les segments dans l'ordre intro → contenu → conclusion
+        if sections:
+            with ThreadPoolExecutor(max_workers=len(sections), thread_name_prefix='tts') as executor:
+                audio_segments = list(executor.map(
+                    self._text_to_speech,
+                    [script[key] for key, _ in sections]
+                ))
+            
+            for _, label in sections:
+                print(f"   {label}")
         
         # Fusion de tous les segments
         if audio_segments:
@@ -74,7 +89,7 @@ class AudioGenerator:
         
         return output_path
     
-    def _text_to_speech(self, text: str) -> AudioSegment:
+    def _text_to_speech(self, text: str) -> 'AudioSegment':
         """
         Convertit du texte en audio avec gTTS
         
@@ -100,7 +115,7 @@ class AudioGenerator:
             tts.save(temp_path)
             
             # Charger comme AudioSegment
-            audio = AudioSegment.from_mp3(temp_path)
+            audio = _audio_segment().from_mp3(temp_path)
             
             return audio
             
@@ -109,7 +124,7 @@ class AudioGenerator:
             if os.path.exists(temp_path):
                 os.unlink(temp_path)
     
-    def _merge_segments(self, segments: list) -> AudioSegment:
+    def _merge_segments(self, segments: list) -> 'AudioSegment':
         """
         Fusionne plusieurs segments audio
         
@@ -119,6 +134,8 @@ class AudioGenerator:
         Returns:
             Audio fusionné
         """
+        AudioSegment = _audio_segment()
+        
         if not segments:
             return AudioSegment.silent(duration=1000)
         
@@ -135,7 +152,7 @@ class AudioGenerator:
         
         return merged
     
-    def _export_audio(self, audio: AudioSegment) -> str:
+    def _export_audio(self, audio: 'AudioSegment') -> str:
         """
         Exporte l'audio final en MP3
         
@@ -6,25 +6,34 @@ sans créer de fichiers JSON redondants.
 import os
 import sqlite3
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 import hashlib
 from datetime import datetime
 import PyPDF2
 import re
+from src.db_pool import ConnectionPool, read_connection
 
 class CourseIndexer:
     """Indexe et catalogue automatiquement les cours existants."""
     
-    def __init__(self, course_materials_path: str, index_db_path: str):
+    def __init__(
+        self,
+        course_materials_path: str,
+        index_db_path: str,
+        pool: Optional[ConnectionPool] = None
+    ):
         """
         Initialise l'indexeur de cours.
         
         Args:
             course_materials_path: Chemin vers data/course_materials/
             index_db_path: Chemin vers la base de données d'index
+            pool: Pool de connexions pour les lectures (sinon une connexion
+                est ouverte à chaque appel)
         """
         self.course_path = Path(course_materials_path)
         self.db_path = index_db_path
+        self.pool = pool
         self._init_database()
         
     def _init_database(self):
@@ -59,6 +68,13 @@ class CourseIndexer:
         )
         ''')
         
+        # Chunks d'un document dans l'ordre : recherche par doc_id et
+        # ORDER BY chunk_index servis par l'index (pas de tri)
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_chunks_doc_order
+        ON document_chunks(doc_id, chunk_index)
+        ''')
+        
         # Table des métadonnées extraites
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS document_metadata (
@@ -78,6 +94,12 @@ class CourseIndexer:
         """
         Scanne tous les PDFs dans data/course_materials/ et les indexe.
         
+        L'extraction du texte (longue) se fait hors transaction ; chaque
+        document nouveau ou modifié est ensuite écrit dans une transaction
+        courte (BEGIN IMMEDIATE ... COMMIT). Le verrou d'écriture n'est donc
+        jamais gardé pendant la lecture des PDF, et un document en erreur
+        n'annule pas les autres.
+        
         Returns:
             Statistiques d'indexation
         """
@@ -88,121 +110,184 @@ class CourseIndexer:
             'errors': 0
         }
         
+        # Empreintes connues, lues une fois pour repérer les fichiers inchangés
+        with read_connection(self.db_path, self.pool) as conn:
+            known_hashes = dict(conn.execute('SELECT doc_id, file_hash FROM documents'))
+        
+        # Sans pool : une connexion en autocommit pour tout le scan
+        conn = None
+        if self.pool is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+        
         print(f"🔍 Scan du répertoire : {self.course_path}")
         
-        # Parcourir M1 et M2
-        for level in ['m1', 'm2']:
-            level_path = self.course_path / level
-            
-            if not level_path.exists():
-                print(f"Dossier {level} introuvable")
-                continue
-            
-            # Parcourir les catégories
-            for category_path in level_path.iterdir():
-                if not category_path.is_dir():
-                    continue
+        try:
+            # Parcourir M1 et M2
+            for level in ['m1', 'm2']:
+                level_path = self.course_path / level
                 
-                category = category_path.name
-                print(f"\nCatégorie : {level.upper()}/{category}")
+                if not level_path.exists():
+                    print(f"Dossier {level} introuvable")
+                    continue
                 
-                # Indexer tous les PDFs de cette catégorie
-                for pdf_file in category_path.glob('**/*.pdf'):
-                    stats['total_files'] += 1
+                # Parcourir les catégories
+                for category_path in level_path.iterdir():
+                    if not category_path.is_dir():
+                        continue
                     
-                    try:
-                        result = self._index_document(
-                            pdf_file, 
-                            level.upper(), 
-                            category
-                        )
+                    category = category_path.name
+                    print(f"\nCatégorie : {level.upper()}/{category}")
+                    
+                    # Indexer tous les PDFs de cette catégorie
+                    for pdf_file in category_path.glob('**/*.pdf'):
+                        stats['total_files'] += 1
                         
-                        if result == 'new':
-                            stats['new_indexed'] += 1
-                            print(f"Indexé : {pdf_file.name}")
-                        elif result == 'updated':
-                            stats['updated'] += 1
-                            print(f"Mis à jour : {pdf_file.name}")
-                        else:
-                            print(f"Déjà à jour : {pdf_file.name}")
+                        try:
+                            document = self._prepare_document(
+                                pdf_file,
+                                level.upper(),
+                                category,
+                                known_hashes
+                            )
+                            
+                            if document is None:
+                                print(f"Déjà à jour : {pdf_file.name}")
+                                continue
                             
-                    except Exception as e:
-                        stats['errors'] += 1
-                        print(f"Erreur avec {pdf_file.name}: {e}")
+                            self._write_document(document, conn)
+                            
+                            if document['is_new']:
+                                stats['new_indexed'] += 1
+                                print(f"Indexé : {pdf_file.name}")
+                            else:
+                                stats['updated'] += 1
+                                print(f"Mis à jour : {pdf_file.name}")
+                                
+                        except Exception as e:
+                            stats['errors'] += 1
+                            print(f"Erreur avec {pdf_file.name}: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
         
         return stats
     
-    def _index_document(
+    def _prepare_document(
         self, 
         pdf_path: Path, 
         level: str, 
-        category: str
-    ) -> str:
+        category: str,
+        known_hashes: Dict[str, str]
+    ) -> Optional[Dict]:
         """
-        Indexe un document PDF.
+        Extrait le contenu d'un document PDF (sans accès à la base).
         
         Args:
             pdf_path: Chemin vers le PDF
             level: M1 ou M2
             category: Catégorie du cours
+            known_hashes: Empreintes des documents déjà indexés (doc_id -> hash)
             
         Returns:
-            'new', 'updated', ou 'unchanged'
+            Lignes à écrire pour ce document, ou None s'il est inchangé
         """
         # Calculer le hash du fichier
         file_hash = self._calculate_file_hash(pdf_path)
         doc_id = self._generate_doc_id(pdf_path)
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Vérifier si le document existe déjà
-        cursor.execute(
-            'SELECT file_hash FROM documents WHERE doc_id = ?', 
-            (doc_id,)
-        )
-        result = cursor.fetchone()
-        
-        if result and result[0] == file_hash:
-            conn.close()
-            return 'unchanged'
+        if known_hashes.get(doc_id) == file_hash:
+            return None
         
         # Extraire le contenu du PDF
         text_content, page_count = self._extract_pdf_content(pdf_path)
         title = self._extract_title_from_content(text_content, pdf_path.name)
         
-        # Insérer ou mettre à jour le document
+        return {
+            'doc_id': doc_id,
+            'is_new': doc_id not in known_hashes,
+            'file_path': str(pdf_path.relative_to(self.course_path.parent)),
+            'level': level,
+            'category': category,
+            'filename': pdf_path.name,
+            'file_hash': file_hash,
+            'page_count': page_count,
+            'title': title,
+            'chunks': self._create_text_chunks(text_content),
+            'metadata': self._extract_metadata(text_content, title)
+        }
+    
+    def _write_document(self, document: Dict, conn: Optional[sqlite3.Connection] = None):
+        """
+        Écrit un document préparé dans une transaction courte.
+        
+        Args:
+            document: Résultat de _prepare_document
+            conn: Connexion en autocommit (sinon la connexion en écriture du pool)
+        """
+        if conn is None:
+            with self.pool.transaction() as pool_conn:
+                self._upsert_document(pool_conn, document)
+            return
+        
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._upsert_document(conn, document)
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+    
+    def _upsert_document(self, conn: sqlite3.Connection, document: Dict):
+        """
+        Insère ou remplace un document, ses chunks et ses métadonnées.
+        
+        Args:
+            conn: Connexion SQLite (transaction ouverte par l'appelant)
+            document: Résultat de _prepare_document
+        """
+        doc_id = document['doc_id']
+        cursor = conn.cursor()
+        
+        # Insérer ou mettre à jour le document (sans DELETE implicite, qui
+        # violerait les clés étrangères des chunks existants)
         cursor.execute('''
-        INSERT OR REPLACE INTO documents 
+        INSERT INTO documents 
         (doc_id, file_path, level, category, filename, file_hash, page_count, extracted_title)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(doc_id) DO UPDATE SET
+            file_path = excluded.file_path,
+            level = excluded.level,
+            category = excluded.category,
+            filename = excluded.filename,
+            file_hash = excluded.file_hash,
+            page_count = excluded.page_count,
+            extracted_title = excluded.extracted_title,
+            indexed_at = CURRENT_TIMESTAMP
         ''', (
             doc_id,
-            str(pdf_path.relative_to(self.course_path.parent)),
-            level,
-            category,
-            pdf_path.name,
-            file_hash,
-            page_count,
-            title
+            document['file_path'],
+            document['level'],
+            document['category'],
+            document['filename'],
+            document['file_hash'],
+            document['page_count'],
+            document['title']
         ))
         
-        # Découper le texte en chunks
-        chunks = self._create_text_chunks(text_content)
-        
         # Supprimer les anciens chunks
         cursor.execute('DELETE FROM document_chunks WHERE doc_id = ?', (doc_id,))
         
         # Insérer les nouveaux chunks
-        for i, chunk in enumerate(chunks):
-            chunk_id = f"{doc_id}_chunk_{i}"
-            cursor.execute('''
-            INSERT INTO document_chunks (chunk_id, doc_id, chunk_index, content, page_number)
-            VALUES (?, ?, ?, ?, ?)
-            ''', (chunk_id, doc_id, i, chunk['text'], chunk['page']))
-        
-        # Extraire et stocker les métadonnées
-        metadata = self._extract_metadata(text_content, title)
+        cursor.executemany('''
+        INSERT INTO document_chunks (chunk_id, doc_id, chunk_index, content, page_number)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (
+            (f"{doc_id}_chunk_{i}", doc_id, i, chunk['text'], chunk['page'])
+            for i, chunk in enumerate(document['chunks'])
+        ))
+        
+        # Stocker les métadonnées
+        metadata = document['metadata']
         cursor.execute('''
         INSERT OR REPLACE INTO document_metadata 
         (doc_id, keywords, topics, difficulty_level, estimated_duration_min)
@@ -214,11 +299,6 @@ class CourseIndexer:
             metadata['difficulty'],
             metadata['duration']
         ))
-        
-        conn.commit()
-        conn.close()
-        
-        return 'new' if result is None else 'updated'
     
     def _calculate_file_hash(self, file_path: Path) -> str:
         """Calcule le hash MD5 d'un fichier."""
@@ -370,20 +450,28 @@ class CourseIndexer:
     
     def get_all_documents(self) -> List[Dict]:
         """Récupère tous les documents indexés."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        SELECT d.doc_id, d.file_path, d.level, d.category, d.filename, 
-               d.extracted_title, d.page_count, m.topics, m.difficulty_level
-        FROM documents d
-        LEFT JOIN document_metadata m ON d.doc_id = m.doc_id
-        ORDER BY d.level, d.category, d.filename
-        ''')
+        return list(self.iter_documents())
+    
+    def iter_documents(self) -> Iterator[Dict]:
+        """
+        Parcourt les documents indexés un par un.
         
-        documents = []
-        for row in cursor.fetchall():
-            documents.append({
+        Les lignes sont lues d'un coup et la connexion rendue au pool avant
+        le premier document : un client lent à recevoir la réponse streamée
+        ne garde pas de connexion en lecture. Seuls les dictionnaires (et
+        leur sérialisation) sont construits au fil du parcours.
+        """
+        with read_connection(self.db_path, self.pool) as conn:
+            rows = conn.execute('''
+            SELECT d.doc_id, d.file_path, d.level, d.category, d.filename, 
+                   d.extracted_title, d.page_count, m.topics, m.difficulty_level
+            FROM documents d
+            LEFT JOIN document_metadata m ON d.doc_id = m.doc_id
+            ORDER BY d.level, d.category, d.filename
+            ''').fetchall()
+        
+        for row in rows:
+            yield {
                 'doc_id': row[0],
                 'file_path': row[1],
                 'level': row[2],
@@ -393,10 +481,7 @@ class CourseIndexer:
                 'page_count': row[6],
                 'topics': row[7].split(',') if row[7] else [],
                 'difficulty': row[8]
-            })
-        
-        conn.close()
-        return documents
+            }
     
     def search_documents(
         self, 
@@ -415,9 +500,6 @@ class CourseIndexer:
         Returns:
             Liste de documents correspondants
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         sql = '''
         SELECT DISTINCT d.doc_id, d.file_path, d.level, d.category, 
                d.filename, d.extracted_title, d.page_count
@@ -438,10 +520,11 @@ class CourseIndexer:
         
         sql += ' ORDER BY d.level, d.category'
         
-        cursor.execute(sql, params)
+        with read_connection(self.db_path, self.pool) as conn:
+            rows = conn.execute(sql, params).fetchall()
         
         results = []
-        for row in cursor.fetchall():
+        for row in rows:
             results.append({
                 'doc_id': row[0],
                 'file_path': row[1],
@@ -452,6 +535,5 @@ class CourseIndexer:
                 'page_count': row[6]
             })
         
-        conn.close()
         return results
         
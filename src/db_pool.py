@@ -0,0 +1,152 @@
+"""
+Pool de connexions SQLite partagées par les routes Flask.
+Les connexions restent ouvertes pendant toute la vie de l'application :
+plus de réouverture du fichier ni de relecture du schéma à chaque requête.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+
+# Réglages appliqués une fois, à l'ouverture de chaque connexion
+CONNECTION_PRAGMAS = (
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA cache_size=-20000',  # 20 Mo de cache de pages
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',  # 256 Mo lus via mmap
+)
+
+# Réglages propres à la connexion en écriture
+WRITER_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',  # Les lectures ne bloquent plus les écritures
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA foreign_keys=ON',
+)
+
+
+class ConnectionPool:
+    """Une connexion en écriture et N connexions en lecture seule."""
+
+    def __init__(self, db_path: str, readers: Optional[int] = None):
+        """
+        Initialise le pool.
+
+        La connexion en écriture est ouverte tout de suite : elle passe la
+        base en WAL et maintient les fichiers -wal/-shm nécessaires aux
+        connexions en lecture seule, ouvertes à la demande.
+
+        Args:
+            db_path: Chemin vers la base SQLite
+            readers: Nombre maximal de connexions en lecture (défaut : nombre de CPU)
+        """
+        self.db_path = db_path
+        self.readers = readers or os.cpu_count() or 4
+
+        self._idle_readers = queue.LifoQueue()
+        self._reader_slots = threading.BoundedSemaphore(self.readers)
+        self._writer_lock = threading.Lock()
+        self._writer = self._connect(readonly=False)
+
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        """Ouvre une nouvelle connexion et applique les PRAGMA."""
+        if readonly:
+            uri = f"file:{Path(self.db_path).resolve().as_posix()}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            pragmas = CONNECTION_PRAGMAS
+        else:
+            # Mode autocommit : les transactions sont ouvertes explicitement
+            # avec BEGIN IMMEDIATE (voir transaction())
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            pragmas = WRITER_PRAGMAS + CONNECTION_PRAGMAS
+
+        for pragma in pragmas:
+            conn.execute(pragma)
+
+        return conn
+
+    @contextmanager
+    def connection(self, readonly: bool = True) -> Iterator[sqlite3.Connection]:
+        """
+        Emprunte une connexion et la rend au pool à la sortie du bloc.
+
+        Args:
+            readonly: True pour une connexion en lecture seule, False pour
+                l'unique connexion en écriture (accès exclusif)
+
+        Yields:
+            Connexion SQLite
+        """
+        if not readonly:
+            with self._writer_lock:
+                yield self._writer
+            return
+
+        with self._reader_slots:
+            try:
+                conn = self._idle_readers.get_nowait()
+            except queue.Empty:
+                conn = self._connect(readonly=True)
+
+            try:
+                yield conn
+            finally:
+                self._idle_readers.put(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Ouvre une transaction d'écriture (BEGIN IMMEDIATE) sur la connexion
+        en écriture ; COMMIT à la sortie du bloc, ROLLBACK en cas d'erreur.
+
+        Yields:
+            Connexion SQLite en écriture
+        """
+        with self.connection(readonly=False) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def close(self):
+        """Ferme toutes les connexions inactives."""
+        while True:
+            try:
+                self._idle_readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+        with self._writer_lock:
+            self._writer.close()
+
+
+@contextmanager
+def read_connection(db_path: str, pool: Optional[ConnectionPool] = None) -> Iterator[sqlite3.Connection]:
+    """
+    Connexion en lecture : empruntée au pool s'il y en a un, sinon ouverte
+    pour la durée du bloc (scripts hors application).
+
+    Args:
+        db_path: Chemin vers la base SQLite
+        pool: Pool de connexions de l'application (optionnel)
+
+    Yields:
+        Connexion SQLite
+    """
+    if pool is not None:
+        with pool.connection() as conn:
+            yield conn
+        return
+
+    conn = sqlite3.connect(db_path)
+    try:
+        yield conn
+    finally:
+        conn.close()
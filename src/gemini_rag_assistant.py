@@ -1,21 +1,59 @@
 import os
-from typing import List, Dict, Optional
+import hashlib
+import json
+import pickle
+import re
+from functools import lru_cache
+from typing import Callable, List, Dict, NamedTuple, Optional, Tuple
 import google.generativeai as genai
 from pathlib import Path
-import sqlite3
 from sentence_transformers import SentenceTransformer
 import numpy as np
 from dotenv import load_dotenv
+from src.prompt_templates import ANSWER_PROMPT_TMPL, ANSWER_WITH_CONTEXT_PROMPT_TMPL
+from src.db_pool import ConnectionPool, read_connection
+
+try:
+    import faiss
+except ImportError:  # faiss-cpu optionnel : recherche exacte NumPy sinon
+    faiss = None
 
 load_dotenv()
 
+# Modes de réduction de la matrice de recherche (voir _prepare_search_matrix)
+QUANTIZATION_MODES = ('int8', 'float16')
+
+# Tableau JSON des questions dans la réponse du quiz
+QUIZ_JSON_RE = re.compile(r'\[.*\]', re.DOTALL)
+
+
+class SearchState(NamedTuple):
+    """
+    Données de recherche cohérentes entre elles (chunks, matrices, masques,
+    index faiss). Une réindexation construit un nouvel état puis le publie
+    en une seule affectation ; une requête lit l'état une fois et s'y tient.
+    """
+    chunk_data: Optional[List[Dict]] = None
+    chunk_embeddings: Optional[np.ndarray] = None
+    search_embeddings: Optional[np.ndarray] = None
+    search_scales: Optional[np.ndarray] = None
+    level_masks: Dict = {}  # niveau -> masque booléen des chunks de ce niveau
+    ann_index: object = None
+
+
 class GeminiRAGAssistant:
     """Assistant Gemini avec accès aux cours AMU via RAG."""
     
     def __init__(
         self, 
         course_index_db: str,
-        embedding_model: str = 'all-MiniLM-L6-v2'
+        embedding_model: str = 'all-MiniLM-L6-v2',
+        embedding_cache_size: int = 4096,
+        embedding_batch_size: int = 64,
+        embedding_quantization: Optional[str] = None,
+        ann_index: Optional[str] = 'hnsw',
+        pool: Optional[ConnectionPool] = None,
+        transport: Optional[str] = None
     ):
         """
         Initialise l'assistant Gemini avec RAG.
@@ -23,13 +61,29 @@ class GeminiRAGAssistant:
         Args:
             course_index_db: Chemin vers la base d'index des cours
             embedding_model: Modèle pour les embeddings sémantiques
+            embedding_cache_size: Nombre d'embeddings de requêtes gardés en cache (LRU)
+            embedding_batch_size: Taille des lots lors de l'encodage des chunks
+            embedding_quantization: None (défaut) pour une matrice de recherche
+                en float32, la plus rapide (BLAS) ; 'int8' (4x moins de mémoire)
+                ou 'float16' (2x moins) pour les machines à court de RAM, au
+                prix d'une conversion en float32 par bloc à chaque requête
+            ann_index: 'hnsw' ou 'ivf' pour un index faiss approximatif (si faiss
+                est installé), None pour la recherche exacte
+            pool: Pool de connexions pour les lectures (sinon une connexion
+                est ouverte à chaque appel)
+            transport: Transport Gemini ('grpc' ou 'rest'), celui de
+                l'application (défaut : variable GEMINI_TRANSPORT, sinon 'grpc')
         """
         # Configuration Gemini
         api_key = os.getenv('GOOGLE_API_KEY')
         if not api_key:
             raise ValueError("GOOGLE_API_KEY non trouvée dans .env")
         
-        genai.configure(api_key=api_key)
+        # Même transport que l'application pour partager un canal persistant
+        genai.configure(
+            api_key=api_key,
+            transport=transport or os.getenv('GEMINI_TRANSPORT', 'grpc')
+        )
         
         self.model = genai.GenerativeModel(
             model_name=os.getenv('GEMINI_MODEL', 'models/gemini-2.5-flash')
@@ -37,63 +91,192 @@ class GeminiRAGAssistant:
         
         # Base de données des cours
         self.db_path = course_index_db
+        self.pool = pool
         
         # Modèle d'embeddings pour la recherche sémantique
         print("Chargement du modèle d'embeddings...")
         self.embedding_model = SentenceTransformer(embedding_model)
+        self.embedding_batch_size = embedding_batch_size
         print("Modèle d'embeddings chargé")
         
-        # Cache des embeddings
-        self.chunk_embeddings = None
-        self.chunk_data = None
+        # Cache LRU des embeddings de requêtes (une même requête n'est encodée qu'une fois)
+        self._cached_query_embedding = lru_cache(maxsize=embedding_cache_size)(
+            self._encode_query
+        )
+        
+        # Matrice de recherche (normalisée une seule fois, éventuellement quantifiée)
+        self.embedding_quantization = embedding_quantization
+        
+        # Index de plus proches voisins approximatif (faiss HNSW ou IVF)
+        self.ann_index = ann_index if faiss is not None else None
+        self.ann_oversampling = 10  # Candidats supplémentaires quand on filtre par niveau
+        self.ann_nprobe = 16  # Listes IVF parcourues par requête
+        
+        # Cache des embeddings et état de recherche publié
+        self._state = SearchState()
         self._load_embeddings_cache()
     
+    @property
+    def chunk_data(self) -> Optional[List[Dict]]:
+        """Métadonnées des chunks de l'état de recherche courant."""
+        return self._state.chunk_data
+    
+    @property
+    def chunk_embeddings(self) -> Optional[np.ndarray]:
+        """Embeddings des chunks de l'état de recherche courant."""
+        return self._state.chunk_embeddings
+    
     def _load_embeddings_cache(self):
-        """Charge ou crée le cache des embeddings."""
-        cache_path = Path(self.db_path).parent / 'embeddings_cache.npz'
+        """
+        Charge ou crée le cache des embeddings.
         
-        if cache_path.exists():
+        La matrice est stockée en .npy brut et ouverte en mmap : elle est lue
+        depuis le cache de pages de l'OS (partagé entre workers) au lieu
+        d'être décompressée dans le tas comme avec np.savez.
+        """
+        cache_dir = Path(self.db_path).parent
+        self.embeddings_path = cache_dir / 'embeddings.npy'
+        self.chunk_data_path = cache_dir / 'chunk_data.pkl'
+        self.quantized_path = cache_dir / f"embeddings_{self.embedding_quantization}.npy"
+        self.scales_path = cache_dir / 'embeddings_scales.npy'
+        legacy_cache_path = cache_dir / 'embeddings_cache.npz'
+        
+        if self.embeddings_path.exists() and self.chunk_data_path.exists():
             print("Chargement du cache d'embeddings...")
-            data = np.load(cache_path, allow_pickle=True)
-            self.chunk_embeddings = data['embeddings']
-            self.chunk_data = data['chunk_data'].tolist()
-            print(f"{len(self.chunk_data)} chunks chargés depuis le cache")
+            chunk_embeddings = np.load(self.embeddings_path, mmap_mode='r')
+            with open(self.chunk_data_path, 'rb') as f:
+                chunk_data = pickle.load(f)
+            print(f"{len(chunk_data)} chunks chargés depuis le cache")
+            self._state = self._prepare_search_matrix(
+                chunk_data,
+                chunk_embeddings,
+                self._load_quantized_embeddings(chunk_embeddings.shape)
+            )
+        elif legacy_cache_path.exists():
+            # Ancien format .npz : converti une fois au nouveau format
+            print("Conversion du cache d'embeddings .npz...")
+            data = np.load(legacy_cache_path, allow_pickle=True)
+            self._state = self._prepare_search_matrix(
+                data['chunk_data'].tolist(),
+                data['embeddings']
+            )
+            self.save_embeddings_cache()
         else:
             print("🔨 Création du cache d'embeddings...")
             self._create_embeddings_cache()
             if self.chunk_embeddings is not None:
-                np.savez(
-                    cache_path,
-                    embeddings=self.chunk_embeddings,
-                    chunk_data=np.array(self.chunk_data, dtype=object)
-                )
-                print(f"Cache créé avec {len(self.chunk_data)} chunks")
+                self.save_embeddings_cache()
     
-    def _create_embeddings_cache(self):
-        """Crée les embeddings pour tous les chunks."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def save_embeddings_cache(self):
+        """
+        Enregistre les embeddings (.npy, mmappable) et les métadonnées des
+        chunks (pickle), ainsi que la matrice de recherche réduite (int8 et
+        ses échelles, ou float16). Les fichiers sont écrits à côté puis
+        renommés : un mmap ouvert sur l'ancienne version reste valide.
+        """
+        state = self._state
         
-        cursor.execute('''
-        SELECT c.chunk_id, c.content, c.doc_id, d.extracted_title, 
-               d.level, d.category, d.file_path
-        FROM document_chunks c
-        JOIN documents d ON c.doc_id = d.doc_id
-        ''')
+        if not state.chunk_data:
+            # Rien à enregistrer ; un ancien cache ne doit pas être rechargé au démarrage
+            for path in (self.embeddings_path, self.chunk_data_path, self.quantized_path, self.scales_path):
+                path.unlink(missing_ok=True)
+            print("Aucun chunk : cache d'embeddings supprimé")
+            return
         
-        rows = cursor.fetchall()
-        conn.close()
+        # Une matrice réduite obsolète ne doit pas être rechargée plus tard
+        cache_dir = self.embeddings_path.parent
+        for mode in QUANTIZATION_MODES:
+            if mode != self.embedding_quantization:
+                (cache_dir / f"embeddings_{mode}.npy").unlink(missing_ok=True)
+        if state.search_scales is None:
+            self.scales_path.unlink(missing_ok=True)
+        
+        outputs = [
+            (self.embeddings_path, np.asarray(state.chunk_embeddings, dtype=np.float32))
+        ]
+        if self.embedding_quantization in QUANTIZATION_MODES:
+            outputs.append((self.quantized_path, state.search_embeddings))
+        if state.search_scales is not None:
+            outputs.append((self.scales_path, state.search_scales.astype(np.float16)))
+        
+        for path, array in outputs:
+            np.save(path.with_suffix('.tmp.npy'), array)
+        chunk_data_tmp = self.chunk_data_path.with_suffix('.tmp')
+        with open(chunk_data_tmp, 'wb') as f:
+            pickle.dump(state.chunk_data, f, protocol=5)
+        
+        for path, _ in outputs:
+            os.replace(path.with_suffix('.tmp.npy'), path)
+        os.replace(chunk_data_tmp, self.chunk_data_path)
+        print(f"Cache d'embeddings enregistré ({len(state.chunk_data)} chunks)")
+    
+    def _load_quantized_embeddings(self, shape: Tuple[int, ...]) -> Optional[Tuple[np.ndarray, Optional[np.ndarray]]]:
+        """
+        Charge (en mmap) la matrice de recherche réduite enregistrée.
+        
+        Args:
+            shape: Dimensions attendues (celles des embeddings float32)
+        
+        Returns:
+            (matrice int8 ou float16, échelles float32 ou None), ou None si
+            aucun mode réduit n'est actif ou si les fichiers manquent ou ne
+            correspondent pas
+        """
+        if self.embedding_quantization not in QUANTIZATION_MODES:
+            return None
+        if not self.quantized_path.exists():
+            return None
+        
+        quantized = np.load(self.quantized_path, mmap_mode='r')
+        if quantized.shape != shape:
+            return None
+        
+        if self.embedding_quantization != 'int8':
+            return quantized, None
+        
+        if not self.scales_path.exists():
+            return None
+        scales = np.load(self.scales_path).astype(np.float32)
+        if len(scales) != len(quantized):
+            return None
+        
+        return quantized, scales
+    
+    def _create_embeddings_cache(self):
+        """
+        Crée les embeddings pour tous les chunks.
+        
+        Lors d'une réindexation, l'embedding d'un chunk déjà présent dans le
+        cache (même chunk_id, même contenu) est réutilisé : seuls les chunks
+        nouveaux ou modifiés passent par le modèle.
+        """
+        with read_connection(self.db_path, self.pool) as conn:
+            rows = conn.execute('''
+            SELECT c.chunk_id, c.content, c.doc_id, d.extracted_title, 
+                   d.level, d.category, d.file_path
+            FROM document_chunks c
+            JOIN documents d ON c.doc_id = d.doc_id
+            ''').fetchall()
         
         if not rows:
             print("Aucun chunk trouvé dans la base de données")
+            # Corpus vidé : les anciens chunks ne doivent plus être proposés
+            self._state = SearchState(chunk_data=[])
             return
         
+        # Embeddings du cache actuel, indexés par chunk_id
+        current = self._state
+        previous = {}
+        if current.chunk_data and current.chunk_embeddings is not None:
+            previous = {chunk['chunk_id']: (i, chunk['content']) for i, chunk in enumerate(current.chunk_data)}
+        
         # Préparer les données
-        self.chunk_data = []
-        texts = []
+        chunk_data = []
+        reused = []  # (position, ligne dans l'ancien cache)
+        to_encode = []  # positions à encoder
         
-        for row in rows:
-            self.chunk_data.append({
+        for position, row in enumerate(rows):
+            chunk_data.append({
                 'chunk_id': row[0],
                 'content': row[1],
                 'doc_id': row[2],
@@ -102,23 +285,247 @@ class GeminiRAGAssistant:
                 'category': row[5],
                 'file_path': row[6]
             })
-            texts.append(row[1])
-        
-        # Créer les embeddings
-        print(f"Création des embeddings pour {len(texts)} chunks...")
-        self.chunk_embeddings = self.embedding_model.encode(
-            texts,
-            show_progress_bar=True,
-            convert_to_numpy=True
+            
+            cached = previous.get(row[0])
+            if cached is not None and cached[1] == row[1]:
+                reused.append((position, cached[0]))
+            else:
+                to_encode.append(position)
+        
+        dim = self.embedding_model.get_sentence_embedding_dimension()
+        embeddings = np.empty((len(rows), dim), dtype=np.float32)
+        
+        if reused:
+            positions, old_rows = zip(*reused)
+            embeddings[list(positions)] = current.chunk_embeddings[list(old_rows)]
+        
+        # Créer les embeddings manquants
+        if to_encode:
+            print(f"Création des embeddings pour {len(to_encode)} chunks ({len(reused)} réutilisés)...")
+            embeddings[to_encode] = self.embedding_model.encode(
+                [rows[position][1] for position in to_encode],
+                batch_size=self.embedding_batch_size,
+                show_progress_bar=True,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            )
+        else:
+            print(f"Embeddings à jour ({len(reused)} chunks réutilisés)")
+        
+        # Les requêtes en cours gardent l'ancien état jusqu'à cette affectation
+        self._state = self._prepare_search_matrix(chunk_data, embeddings)
+    
+    def _prepare_search_matrix(
+        self,
+        chunk_data: List[Dict],
+        chunk_embeddings: np.ndarray,
+        quantized: Optional[Tuple[np.ndarray, Optional[np.ndarray]]] = None
+    ) -> SearchState:
+        """
+        Prépare la matrice utilisée par find_relevant_chunks.
+        
+        Les embeddings sont normalisés une fois (et non à chaque requête).
+        En mode int8, chaque vecteur est quantifié symétriquement :
+        q = round(v / s) avec s = max|v| / 127, et la similarité vaut
+        s * (q · requête). En mode float16, la matrice est simplement
+        stockée en demi-précision (largement suffisant pour classer des
+        similarités cosinus).
+        
+        Args:
+            chunk_data: Métadonnées des chunks
+            chunk_embeddings: Embeddings des chunks (float32)
+            quantized: Matrice réduite et échelles déjà calculées (cache disque)
+        
+        Returns:
+            Nouvel état de recherche (à publier par l'appelant)
+        """
+        if chunk_embeddings is None or len(chunk_embeddings) == 0:
+            return SearchState(chunk_data=chunk_data, chunk_embeddings=chunk_embeddings)
+        
+        # Filtre par niveau précalculé (au lieu d'un parcours de chunk_data par requête)
+        levels = np.array([chunk['level'] for chunk in chunk_data], dtype=object)
+        level_masks = {level: levels == level for level in set(levels)}
+        
+        embeddings = np.asarray(chunk_embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        if np.allclose(norms, 1, atol=1e-4):
+            # Déjà normalisés à l'encodage : la matrice (mmap) sert telle quelle
+            normalized = embeddings
+        else:
+            norms[norms == 0] = 1  # Éviter division par zéro
+            normalized = embeddings / norms
+        
+        if quantized is not None:
+            search_embeddings, search_scales = quantized
+            print(f"Embeddings {self.embedding_quantization} chargés depuis le cache ({search_embeddings.nbytes // 1024} Ko)")
+        elif self.embedding_quantization == 'float16':
+            search_embeddings = normalized.astype(np.float16)
+            search_scales = None
+            print(f"Embeddings stockés en float16 ({search_embeddings.nbytes // 1024} Ko)")
+        elif self.embedding_quantization == 'int8':
+            scales = np.abs(normalized).max(axis=1, keepdims=True) / 127
+            scales[scales == 0] = 1
+            search_embeddings = np.round(normalized / scales).astype(np.int8)
+            search_scales = scales.ravel()
+            print(f"Embeddings quantifiés en int8 ({search_embeddings.nbytes // 1024} Ko)")
+        else:
+            search_embeddings = normalized
+            search_scales = None
+        
+        ann_index = None
+        if self.ann_index in ('hnsw', 'ivf'):
+            ann_index = self._load_or_build_ann_index(normalized)
+        
+        return SearchState(
+            chunk_data=chunk_data,
+            chunk_embeddings=chunk_embeddings,
+            search_embeddings=search_embeddings,
+            search_scales=search_scales,
+            level_masks=level_masks,
+            ann_index=ann_index
         )
     
-    def _generate_embedding(self, text: str) -> np.ndarray:
-        """Génère l'embedding pour un texte donné."""
-        return self.embedding_model.encode(
+    def _load_or_build_ann_index(self, normalized: np.ndarray):
+        """
+        Charge l'index faiss (HNSW ou IVF) correspondant aux embeddings, ou
+        le construit.
+        
+        Le fichier est nommé d'après une empreinte des embeddings : un index
+        construit pour un autre état de la base n'est jamais réutilisé.
+        
+        Args:
+            normalized: Embeddings normalisés (float32)
+        
+        Returns:
+            Index faiss
+        """
+        index_dir = Path(self.db_path).parent / 'vector_embeddings'
+        fingerprint = hashlib.sha1(normalized.tobytes()).hexdigest()[:16]
+        index_path = index_dir / f"{self.ann_index}_{self.embedding_quantization or 'flat'}_{fingerprint}.faiss"
+        kind = self.ann_index.upper()
+        
+        if index_path.exists():
+            index = faiss.read_index(str(index_path))
+            print(f"Index {kind} chargé ({index.ntotal} vecteurs)")
+            return index
+        
+        print(f"🔨 Construction de l'index {kind}...")
+        dim = normalized.shape[1]
+        quantizer_type = {
+            'int8': faiss.ScalarQuantizer.QT_8bit,
+            'float16': faiss.ScalarQuantizer.QT_fp16
+        }.get(self.embedding_quantization)
+        
+        if self.ann_index == 'ivf':
+            # ~4·sqrt(N) listes ; une requête n'en parcourt que ann_nprobe
+            nlist = max(1, min(int(4 * np.sqrt(len(normalized))), len(normalized) // 39 or 1))
+            coarse = faiss.IndexFlatIP(dim)
+            if quantizer_type is not None:
+                index = faiss.IndexIVFScalarQuantizer(coarse, dim, nlist, quantizer_type, faiss.METRIC_INNER_PRODUCT)
+            else:
+                index = faiss.IndexIVFFlat(coarse, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(normalized)
+        elif quantizer_type is not None:
+            index = faiss.IndexHNSWSQ(dim, quantizer_type, 32, faiss.METRIC_INNER_PRODUCT)
+            index.train(normalized)
+            index.hnsw.efConstruction = 200
+        else:
+            index = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = 200
+        index.add(normalized)
+        
+        # Remplacer les index obsolètes
+        index_dir.mkdir(parents=True, exist_ok=True)
+        for old_index in index_dir.glob('*.faiss'):
+            old_index.unlink()
+        faiss.write_index(index, str(index_path))
+        print(f"Index {kind} créé ({index.ntotal} vecteurs)")
+        return index
+    
+    def _search_ann(
+        self,
+        state: SearchState,
+        query_embedding: np.ndarray,
+        top_k: int,
+        level: Optional[str]
+    ) -> Optional[List[Dict]]:
+        """
+        Recherche approximative dans l'index faiss (HNSW ou IVF).
+        
+        Returns:
+            Chunks pertinents, ou None si le filtre par niveau a écarté trop
+            de candidats (la recherche exacte prend alors le relais)
+        """
+        index = state.ann_index
+        total = index.ntotal
+        k = min(top_k * self.ann_oversampling if level else top_k, total)
+        if self.ann_index == 'ivf':
+            index.nprobe = self.ann_nprobe
+        else:
+            index.hnsw.efSearch = max(64, k)
+        
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        scores, indices = index.search(query, k)
+        
+        results = []
+        for score, idx in zip(scores[0], indices[0]):
+            if idx < 0 or score <= 0.2:  # Résultats triés : le reste est sous le seuil
+                break
+            
+            chunk = state.chunk_data[idx]
+            if level and chunk['level'] != level:
+                continue
+            
+            chunk = chunk.copy()
+            chunk['similarity'] = float(score)
+            results.append(chunk)
+            
+            if len(results) == top_k:
+                return results
+        
+        # Tous les candidats sont pertinents mais filtrés : il peut en rester d'autres
+        if level and k < total and len(indices[0]) == k and scores[0][-1] > 0.2:
+            return None
+        
+        return results
+    
+    def _compute_similarities(
+        self,
+        state: SearchState,
+        query_embedding: np.ndarray,
+        block_size: int = 8192
+    ) -> np.ndarray:
+        """Similarités cosinus entre la requête et tous les chunks."""
+        matrix = state.search_embeddings
+        if matrix.dtype == np.float32:
+            return matrix @ query_embedding
+        
+        # int8 / float16 : produit scalaire par blocs (seul un bloc est
+        # converti en float32, NumPy n'ayant pas de BLAS pour ces types)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        similarities = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(similarities), block_size):
+            block = matrix[start:start + block_size]
+            similarities[start:start + block_size] = block.astype(np.float32) @ query
+        
+        if state.search_scales is not None:
+            similarities *= state.search_scales
+        return similarities
+    
+    def _encode_query(self, text: str) -> np.ndarray:
+        """Encode un texte (sans cache) et protège le résultat en écriture."""
+        embedding = self.embedding_model.encode(
             text,
             convert_to_numpy=True,
             normalize_embeddings=True
         )
+        # Le tableau est partagé par le cache : il ne doit pas être modifié
+        embedding.setflags(write=False)
+        return embedding
+    
+    def _generate_embedding(self, text: str) -> np.ndarray:
+        """Génère l'embedding pour un texte donné (avec cache LRU)."""
+        return self._cached_query_embedding(text)
     
     def find_relevant_chunks(
         self, 
@@ -137,44 +544,45 @@ class GeminiRAGAssistant:
         Returns:
             Liste des chunks pertinents avec métadonnées
         """
-        if self.chunk_embeddings is None or len(self.chunk_embeddings) == 0:
+        # Un seul état pour toute la requête, même si une réindexation
+        # en publie un nouveau entre-temps
+        state = self._state
+        if state.search_embeddings is None:
             return []
         
         # Encoder la question avec normalisation
         query_embedding = self._generate_embedding(query)
         
-        # Normaliser les embeddings des chunks si ce n'est pas déjà fait
-        chunk_norms = np.linalg.norm(self.chunk_embeddings, axis=1, keepdims=True)
-        chunk_norms = np.where(chunk_norms == 0, 1, chunk_norms)  # Éviter division par zéro
-        normalized_chunks = self.chunk_embeddings / chunk_norms
+        # Recherche approximative si l'index faiss est disponible
+        if state.ann_index is not None:
+            results = self._search_ann(state, query_embedding, top_k, level)
+            if results is not None:
+                return results
         
-        # Calculer les similarités cosinus
-        similarities = np.dot(normalized_chunks, query_embedding)
+        # Calculer les similarités cosinus (chunks déjà normalisés)
+        similarities = self._compute_similarities(state, query_embedding)
         
         # Remplacer les NaN et Inf par 0
         similarities = np.nan_to_num(similarities, nan=0.0, posinf=0.0, neginf=0.0)
         
         # Filtrer par niveau si spécifié
         if level:
-            valid_indices = [
-                i for i, chunk in enumerate(self.chunk_data)
-                if chunk['level'] == level
-            ]
+            mask = state.level_masks.get(level)
             
-            if not valid_indices:
+            if mask is None:
                 return []
             
-            # Créer un masque pour les indices valides
-            mask = np.zeros(len(similarities), dtype=bool)
-            mask[valid_indices] = True
-            
             # Mettre -1 pour les indices non valides
             filtered_similarities = np.where(mask, similarities, -1.0)
         else:
             filtered_similarities = similarities
         
-        # Récupérer les top_k indices
-        top_indices = np.argsort(filtered_similarities)[-top_k:][::-1]
+        # Récupérer les top_k indices : sélection en O(N), puis tri des k seuls
+        k = min(top_k, len(filtered_similarities))
+        if k <= 0:
+            return []
+        top_indices = np.argpartition(filtered_similarities, -k)[-k:]
+        top_indices = top_indices[np.argsort(filtered_similarities[top_indices])[::-1]]
         
         # Construire les résultats
         results = []
@@ -183,7 +591,7 @@ class GeminiRAGAssistant:
             
             # Vérifier que la similarité est valide et au-dessus du seuil
             if similarity_score > 0.2:  # Seuil de pertinence abaissé
-                chunk = self.chunk_data[idx].copy()
+                chunk = state.chunk_data[idx].copy()
                 
                 # S'assurer que similarity est un nombre valide
                 if np.isnan(similarity_score) or np.isinf(similarity_score):
@@ -198,7 +606,8 @@ class GeminiRAGAssistant:
         self, 
         question: str,
         level: Optional[str] = None,
-        include_sources: bool = True
+        include_sources: bool = True,
+        on_chunk: Optional[Callable[[str], None]] = None
     ) -> Dict:
         """
         Répond à une question en utilisant les cours comme références.
@@ -207,6 +616,8 @@ class GeminiRAGAssistant:
             question: Question de l'utilisateur
             level: Filtrer les références par niveau
             include_sources: Inclure les sources dans la réponse
+            on_chunk: Si fourni, la réponse est générée en streaming et
+                chaque fragment de texte lui est passé au fur et à mesure
             
         Returns:
             Dictionnaire avec la réponse et les sources
@@ -220,16 +631,10 @@ class GeminiRAGAssistant:
         
         if not relevant_chunks:
             # Réponse sans contexte
-            prompt = f"""Tu es un assistant pédagogique spécialisé en Data Science.
-            
-Question : {question}
-
-Réponds de manière claire et pédagogique, même sans documents de référence disponibles."""
-            
-            response = self.model.generate_content(prompt)
+            prompt = ANSWER_PROMPT_TMPL.substitute(question=question)
             
             return {
-                'answer': self._extract_response_text(response),
+                'answer': self._generate_text(prompt, on_chunk=on_chunk),
                 'sources': [],
                 'has_course_references': False
             }
@@ -238,31 +643,19 @@ Réponds de manière claire et pédagogique, même sans documents de référence
         context = self._build_context(relevant_chunks)
         
         # Créer le prompt avec contexte
-        prompt = f"""Tu es un assistant pédagogique spécialisé en Data Science pour l'université AMU.
-
-CONTEXTE (extrait des cours AMU) :
-{context}
-
-QUESTION DE L'ÉTUDIANT :
-{question}
-
-INSTRUCTIONS :
-1. Réponds de manière claire, pédagogique et structurée
-2. Utilise les informations du contexte fourni
-3. Cite explicitement les cours utilisés (ex: "Selon le cours de Machine Learning M1...")
-4. Si le contexte ne suffit pas, indique-le et donne quand même une réponse générale
-5. Utilise des exemples concrets si possible
-6. Structure ta réponse avec des sections claires
-
-RÉPONSE :"""
+        prompt = ANSWER_WITH_CONTEXT_PROMPT_TMPL.substitute(
+            context=context,
+            question=question
+        )
         
         # Générer la réponse
-        response = self.model.generate_content(
+        answer = self._generate_text(
             prompt,
             generation_config=genai.types.GenerationConfig(
                 temperature=float(os.getenv('GEMINI_TEMPERATURE', 0.7)),
                 max_output_tokens=int(os.getenv('GEMINI_MAX_TOKENS', 2048))
-            )
+            ),
+            on_chunk=on_chunk
         )
         
         # Préparer les sources
@@ -271,12 +664,50 @@ RÉPONSE :"""
             sources = self._format_sources(relevant_chunks)
         
         return {
-            'answer': self._extract_response_text(response),
+            'answer': answer,
             'sources': sources,
             'has_course_references': True,
             'relevant_courses': list(set([c['title'] for c in relevant_chunks]))
         }
     
+    def _generate_text(
+        self,
+        prompt: str,
+        generation_config=None,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """
+        Génère un texte avec Gemini, en streaming si on_chunk est fourni.
+        
+        Args:
+            prompt: Prompt envoyé au modèle
+            generation_config: Paramètres de génération (optionnel)
+            on_chunk: Fonction appelée avec chaque fragment de texte
+            
+        Returns:
+            Texte complet généré
+        """
+        if on_chunk is None:
+            response = self.model.generate_content(prompt, generation_config=generation_config)
+            return self._extract_response_text(response)
+        
+        parts = []
+        for chunk in self.model.generate_content(
+            prompt,
+            generation_config=generation_config,
+            stream=True
+        ):
+            try:
+                text = chunk.text
+            except (ValueError, AttributeError):
+                # Fragment sans texte (ex: métadonnées de fin de génération)
+                continue
+            
+            parts.append(text)
+            on_chunk(text)
+        
+        return ''.join(parts)
+    
     def _extract_response_text(self, response) -> str:
         """
         Extrait le texte d'une réponse Gemini de manière robuste.
@@ -352,20 +783,15 @@ RÉPONSE :"""
             Liste de questions avec options et réponses
         """
         # Récupérer le contenu du cours
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        SELECT c.content, d.extracted_title
-        FROM document_chunks c
-        JOIN documents d ON c.doc_id = d.doc_id
-        WHERE c.doc_id = ?
-        ORDER BY c.chunk_index
-        LIMIT 10
-        ''', (doc_id,))
-        
-        rows = cursor.fetchall()
-        conn.close()
+        with read_connection(self.db_path, self.pool) as conn:
+            rows = conn.execute('''
+            SELECT c.content, d.extracted_title
+            FROM document_chunks c
+            JOIN documents d ON c.doc_id = d.doc_id
+            WHERE c.doc_id = ?
+            ORDER BY c.chunk_index
+            LIMIT 10
+            ''', (doc_id,)).fetchall()
         
         if not rows:
             return []
@@ -400,12 +826,8 @@ Réponds UNIQUEMENT avec le JSON, sans texte supplémentaire."""
         response = self.model.generate_content(prompt)
         response_text = self._extract_response_text(response)
         
-        # Parser la réponse JSON
-        import json
-        import re
-        
         # Extraire le JSON de la réponse
-        json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
+        json_match = QUIZ_JSON_RE.search(response_text)
         if json_match:
             try:
                 quiz_questions = json.loads(json_match.group())
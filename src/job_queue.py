@@ -0,0 +1,208 @@
+"""
+File de tâches en arrière-plan pour les traitements longs (appels Gemini,
+extraction, génération audio). Les routes HTTP rendent la main tout de suite
+avec un job_id ; l'état du job est consultable ensuite, ou suivi en direct (file d'évènements
+de progression par abonné).
+"""
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+# Enfant du logger de l'application : messages écrits par son QueueListener
+logger = logging.getLogger('amu_app.jobs')
+
+
+class BackgroundJobManager:
+    """Exécute des jobs dans un pool de threads et conserve leur état."""
+
+    def __init__(self, max_workers: int = 4, ttl_seconds: int = 3600):
+        """
+        Initialise le gestionnaire de jobs.
+
+        Args:
+            max_workers: Nombre de jobs exécutés en parallèle
+            ttl_seconds: Durée de conservation d'un job terminé (en secondes)
+        """
+        self.ttl_seconds = ttl_seconds
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='job'
+        )
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._subscribers = {}  # job_id -> files d'évènements des abonnés
+
+    def submit(
+        self,
+        fn: Callable,
+        *args,
+        on_done: Optional[Callable[[Dict], None]] = None,
+        with_progress: bool = False,
+        **kwargs
+    ) -> str:
+        """
+        Soumet un job.
+
+        Args:
+            fn: Fonction à exécuter (son résultat doit être sérialisable en JSON)
+            on_done: Fonction appelée avec l'état final du job
+            with_progress: Si True, fn reçoit un argument progress(stage, pct)
+                pour signaler l'avancement aux abonnés (voir subscribe())
+            *args, **kwargs: Arguments passés à fn
+
+        Returns:
+            Identifiant du job
+        """
+        job_id = uuid.uuid4().hex
+
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'status': 'queued',
+                'result': None,
+                'error': None,
+                'progress': None,
+                'created_at': time.time(),
+                'finished_at': None
+            }
+
+        if with_progress:
+            kwargs['progress'] = lambda stage, pct: self.report_progress(job_id, stage, pct)
+
+        self._executor.submit(self._run, job_id, fn, args, kwargs, on_done)
+        return job_id
+
+    def _run(self, job_id: str, fn: Callable, args, kwargs, on_done):
+        """Exécute un job et enregistre son résultat ou son erreur."""
+        self._update(job_id, status='running')
+
+        try:
+            result = fn(*args, **kwargs)
+            self._update(job_id, status='done', result=result, finished_at=time.time())
+        except Exception as e:
+            self._update(job_id, status='error', error=str(e), finished_at=time.time())
+
+        # Dernier évènement pour les abonnés, qui peuvent alors se détacher
+        with self._lock:
+            job = self._jobs[job_id]
+            self._publish(job_id, {
+                'stage': job['status'],
+                'pct': 100 if job['status'] == 'done' else None,
+                'error': job['error']
+            })
+
+        if on_done:
+            try:
+                on_done(self.get(job_id))
+            except Exception:
+                logger.exception("Erreur notification du job %s", job_id)
+
+    def _update(self, job_id: str, **fields):
+        """Met à jour l'état d'un job."""
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _publish(self, job_id: str, event: Dict):
+        """Envoie un évènement à tous les abonnés d'un job (verrou déjà pris)."""
+        for events in self._subscribers.get(job_id, ()):
+            events.put(event)
+
+    def report_progress(self, job_id: str, stage: str, pct: Optional[int] = None):
+        """
+        Signale l'avancement d'un job.
+
+        Args:
+            job_id: Identifiant du job
+            stage: Étape en cours (ex: 'extract', 'script', 'tts')
+            pct: Pourcentage d'avancement estimé
+        """
+        event = {'stage': stage, 'pct': pct}
+        with self._lock:
+            self._jobs[job_id]['progress'] = event
+            self._publish(job_id, event)
+
+    def subscribe(self, job_id: str) -> Optional[queue.Queue]:
+        """
+        S'abonne aux évènements de progression d'un job.
+
+        La file reçoit d'abord l'état courant, puis chaque évènement ; le
+        dernier a pour étape 'done' ou 'error'.
+
+        Args:
+            job_id: Identifiant du job
+
+        Returns:
+            File d'évènements, ou None si le job est inconnu
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+
+            events = queue.Queue()
+            if job['finished_at']:
+                events.put({
+                    'stage': job['status'],
+                    'pct': 100 if job['status'] == 'done' else None,
+                    'error': job['error']
+                })
+            else:
+                events.put(job['progress'] or {'stage': job['status'], 'pct': 0})
+                self._subscribers.setdefault(job_id, []).append(events)
+
+            return events
+
+    def unsubscribe(self, job_id: str, events: queue.Queue):
+        """
+        Se désabonne des évènements d'un job.
+
+        Args:
+            job_id: Identifiant du job
+            events: File retournée par subscribe()
+        """
+        with self._lock:
+            subscribers = self._subscribers.get(job_id, [])
+            if events in subscribers:
+                subscribers.remove(events)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+    def _prune(self):
+        """
+        Oublie les jobs terminés depuis plus de ttl_seconds, ainsi que leurs
+        abonnés restants (client SSE jamais déconnecté proprement) ; verrou
+        déjà pris.
+        """
+        limit = time.time() - self.ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job['finished_at'] and job['finished_at'] < limit
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+            self._subscribers.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Récupère l'état d'un job.
+
+        Args:
+            job_id: Identifiant du job
+
+        Returns:
+            Copie de l'état du job ou None s'il est inconnu
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def shutdown(self):
+        """Arrête le pool en laissant finir les jobs en cours."""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,217 @@
+"""
+Index SQLite des fichiers produits par l'application (uploads, podcasts).
+Le chemin de chaque fichier est enregistré à sa création, ce qui évite
+de parcourir les dossiers avec glob à chaque requête.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson optionnel : module json standard sinon
+    orjson = None
+
+
+class MediaIndex:
+    """Associe un file_id aux chemins de son upload et de son audio."""
+
+    def __init__(self, db_path: str = 'database/media_index.db'):
+        """
+        Initialise l'index des médias.
+
+        Args:
+            db_path: Chemin vers la base SQLite de l'index
+        """
+        self.db_path = db_path
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._init_database()
+
+    def _init_database(self):
+        """Crée la table des médias si nécessaire."""
+        with self._lock, self._conn:
+            self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS media (
+                file_id TEXT PRIMARY KEY,
+                upload_path TEXT,
+                audio_path TEXT,
+                metadata TEXT,
+                sha256 TEXT,
+                created_at REAL NOT NULL
+            )
+            ''')
+
+            # Bases créées avant l'ajout des colonnes metadata / sha256
+            columns = [row[1] for row in self._conn.execute('PRAGMA table_info(media)')]
+            for column in ('metadata', 'sha256'):
+                if column not in columns:
+                    self._conn.execute(f'ALTER TABLE media ADD COLUMN {column} TEXT')
+
+            # Texte extrait, indexé par le contenu du fichier (SHA-256)
+            self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS extracted_text (
+                sha256 TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            ''')
+
+    def register_upload(self, file_id: str, upload_path: str, sha256: Optional[str] = None):
+        """
+        Enregistre le chemin d'un fichier uploadé.
+
+        Args:
+            file_id: Identifiant du fichier
+            upload_path: Chemin du fichier sur le disque
+            sha256: Empreinte SHA-256 du contenu du fichier
+        """
+        with self._lock, self._conn:
+            self._conn.execute('''
+            INSERT INTO media (file_id, upload_path, audio_path, sha256, created_at)
+            VALUES (?, ?, NULL, ?, ?)
+            ON CONFLICT(file_id) DO UPDATE SET
+                upload_path = excluded.upload_path,
+                sha256 = excluded.sha256
+            ''', (file_id, upload_path, sha256, time.time()))
+
+    def set_audio_path(self, file_id: str, audio_path: str):
+        """
+        Enregistre le chemin du podcast généré pour un fichier.
+
+        Args:
+            file_id: Identifiant du fichier
+            audio_path: Chemin du fichier audio sur le disque
+        """
+        with self._lock, self._conn:
+            self._conn.execute('''
+            INSERT INTO media (file_id, upload_path, audio_path, created_at)
+            VALUES (?, NULL, ?, ?)
+            ON CONFLICT(file_id) DO UPDATE SET audio_path = excluded.audio_path
+            ''', (file_id, audio_path, time.time()))
+
+    def _get_column(self, file_id: str, column: str) -> Optional[str]:
+        """Lit une colonne de chemin pour un file_id."""
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT {column} FROM media WHERE file_id = ?',
+                (file_id,)
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def get_upload_path(self, file_id: str) -> Optional[str]:
+        """
+        Récupère le chemin du fichier uploadé.
+
+        Args:
+            file_id: Identifiant du fichier
+
+        Returns:
+            Chemin du fichier ou None
+        """
+        return self._get_column(file_id, 'upload_path')
+
+    def get_sha256(self, file_id: str) -> Optional[str]:
+        """
+        Récupère l'empreinte SHA-256 du fichier uploadé.
+
+        Args:
+            file_id: Identifiant du fichier
+
+        Returns:
+            Empreinte hexadécimale ou None
+        """
+        return self._get_column(file_id, 'sha256')
+
+    def get_audio_path(self, file_id: str) -> Optional[str]:
+        """
+        Récupère le chemin du podcast généré.
+
+        Args:
+            file_id: Identifiant du fichier
+
+        Returns:
+            Chemin du fichier audio ou None
+        """
+        return self._get_column(file_id, 'audio_path')
+
+    def set_metadata(self, file_id: str, metadata: Dict):
+        """
+        Enregistre les métadonnées du podcast généré pour un fichier.
+
+        Args:
+            file_id: Identifiant du fichier
+            metadata: Métadonnées sérialisables en JSON
+        """
+        if orjson:
+            payload = orjson.dumps(metadata).decode()
+        else:
+            payload = json.dumps(metadata, ensure_ascii=False)
+
+        with self._lock, self._conn:
+            self._conn.execute('''
+            INSERT INTO media (file_id, metadata, created_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT(file_id) DO UPDATE SET metadata = excluded.metadata
+            ''', (file_id, payload, time.time()))
+
+    def get_metadata(self, file_id: str) -> Optional[Dict]:
+        """
+        Récupère les métadonnées du podcast généré.
+
+        Args:
+            file_id: Identifiant du fichier
+
+        Returns:
+            Métadonnées ou None
+        """
+        metadata = self._get_column(file_id, 'metadata')
+        if not metadata:
+            return None
+
+        return orjson.loads(metadata) if orjson else json.loads(metadata)
+
+    def get_extracted_text(self, sha256: str):
+        """
+        Récupère le texte déjà extrait d'un fichier de même contenu.
+
+        Args:
+            sha256: Empreinte SHA-256 du fichier
+
+        Returns:
+            Résultat de l'extraction ou None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT payload FROM extracted_text WHERE sha256 = ?',
+                (sha256,)
+            ).fetchone()
+
+        if not row:
+            return None
+
+        return orjson.loads(row[0]) if orjson else json.loads(row[0])
+
+    def set_extracted_text(self, sha256: str, extracted):
+        """
+        Enregistre le résultat de l'extraction d'un fichier.
+
+        Args:
+            sha256: Empreinte SHA-256 du fichier
+            extracted: Résultat de l'extraction (sérialisable en JSON)
+        """
+        if orjson:
+            payload = orjson.dumps(extracted).decode()
+        else:
+            payload = json.dumps(extracted, ensure_ascii=False)
+
+        with self._lock, self._conn:
+            self._conn.execute('''
+            INSERT OR REPLACE INTO extracted_text (sha256, payload, created_at)
+            VALUES (?, ?, ?)
+            ''', (sha256, payload, time.time()))
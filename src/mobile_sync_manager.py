@@ -1,6 +1,7 @@
 import json
+import time
 from typing import Dict, List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 import uuid
 
 class MobileSyncManager:
@@ -16,6 +17,8 @@ class MobileSyncManager:
         self.db_path = database_path
         self.active_sessions = {}
         self.sync_queue = []
+        # Horloges monotones des sessions (internes, jamais envoyées aux clients)
+        self._session_clocks = {}
         
     def create_session(self, user_id: str, device_info: Dict) -> str:
         """
@@ -45,6 +48,7 @@ class MobileSyncManager:
         }
         
         self.active_sessions[session_id] = session_data
+        self._session_clocks[session_id] = time.monotonic()
         
         print(f"Session créée : {session_id} pour {user_id}")
         
@@ -72,6 +76,22 @@ class MobileSyncManager:
             
             print(f"Position audio synchronisée : {position_seconds}s (session: {session_id[:8]}...)")
     
+    def elapsed_ms(self, session_id: str) -> int:
+        """
+        Temps écoulé depuis le début d'une session, en millisecondes.
+        
+        Args:
+            session_id: Identifiant de la session
+            
+        Returns:
+            Millisecondes depuis la création de la session (0 si inconnue)
+        """
+        started = self._session_clocks.get(session_id)
+        if started is None:
+            return 0
+        
+        return int((time.monotonic() - started) * 1000) & 0xFFFFFFFF
+    
     def get_session_state(self, session_id: str) -> Optional[Dict]:
         """
         Récupère l'état actuel d'une session.
@@ -150,8 +170,6 @@ class MobileSyncManager:
         Args:
             timeout_minutes: Délai d'inactivité en minutes
         """
-        from datetime import timedelta
-        
         now = datetime.now()
         sessions_to_remove = []
         
@@ -164,6 +182,7 @@ class MobileSyncManager:
         for session_id in sessions_to_remove:
             self.close_session(session_id)
             del self.active_sessions[session_id]
+            self._session_clocks.pop(session_id, None)
         
         if sessions_to_remove:
             print(f"{len(sessions_to_remove)} sessions inactives nettoyées")
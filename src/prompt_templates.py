@@ -0,0 +1,143 @@
+"""
+Templates des prompts Gemini utilisés par l'application.
+Le texte fixe est compilé une seule fois au chargement du module :
+à chaque requête, seules les variables sont substituées.
+"""
+
+from string import Template
+
+
+# Préambule commun, identique octet pour octet et toujours en tête des
+# prompts d'explication et de réponse : le cache de préfixe du fournisseur
+# peut ainsi réutiliser son traitement d'une requête à l'autre.
+SYSTEM_PREAMBLE = (
+    "Tu es un assistant pédagogique expert en Data Science pour l'université AMU "
+    "(Aix-Marseille Université). Tu t'adresses à des étudiants de Master.\n\n"
+)
+
+
+# Analyse du sujet d'un document uploadé (mots-clés)
+SUBJECT_PROMPT_TMPL = Template("""Analyse ce texte et identifie le sujet principal en quelques mots-clés pertinents pour la Data Science.
+
+Texte:
+$text
+
+Réponds UNIQUEMENT avec 3-5 mots-clés séparés par des virgules (ex: machine learning, régression, python).
+Ne donne pas d'explication, juste les mots-clés.""")
+
+# Résumé court d'un document uploadé
+SUMMARY_PROMPT_TMPL = Template("""Résume en 2-3 phrases claires le contenu principal de ce document:
+
+$text
+
+Résumé concis:""")
+
+# Explication d'un document uploadé, avec cours AMU de référence
+EXPLANATION_WITH_CONTEXT_PROMPT_TMPL = Template(SYSTEM_PREAMBLE + """DOCUMENT UPLOADÉ PAR L'ÉTUDIANT:
+$text
+
+COURS DE RÉFÉRENCE DISPONIBLES DANS LA BASE AMU:
+$context
+
+TÂCHE:
+1. Explique le contenu du document uploadé de manière claire et pédagogique
+2. Fais des liens explicites avec les cours de référence AMU mentionnés ci-dessus
+3. Structure ta réponse avec des sections claires (utilise des titres avec **)
+4. Cite les cours AMU pertinents (ex: "Selon le cours Machine Learning M1...")
+5. Ajoute des exemples concrets si pertinent
+6. Si le document traite d'un sujet similaire à un cours AMU, mentionne-le
+
+EXPLICATION DÉTAILLÉE:""")
+
+# Explication d'un document uploadé, sans cours de référence
+EXPLANATION_PROMPT_TMPL = Template(SYSTEM_PREAMBLE + """DOCUMENT UPLOADÉ PAR L'ÉTUDIANT:
+$text
+
+TÂCHE:
+1. Explique le contenu de ce document de manière claire et pédagogique
+2. Structure ta réponse avec des sections claires (utilise des titres avec **)
+3. Ajoute des exemples concrets si pertinent
+4. Indique que ce sujet n'est pas directement couvert dans les cours AMU disponibles
+
+EXPLICATION DÉTAILLÉE:""")
+
+# Consignes selon le niveau de détail demandé pour /api/explain
+DETAIL_INSTRUCTIONS = {
+    'simple': "Explique de manière simple et accessible, comme à un débutant. Utilise des analogies.",
+    'detailed': "Explique de manière détaillée avec des exemples concrets et des formules si nécessaire.",
+    'expert': "Explique de manière technique et approfondie, avec les détails mathématiques et les nuances importantes."
+}
+
+# Explication d'un sujet, avec extraits des cours AMU
+TOPIC_WITH_CONTEXT_PROMPT_TMPL = Template(SYSTEM_PREAMBLE + """SUJET À EXPLIQUER: $topic
+
+EXTRAITS DES COURS AMU PERTINENTS:
+$context
+
+INSTRUCTIONS:
+$instructions
+
+Structure ta réponse ainsi:
+1. Définition : Qu'est-ce que c'est ?
+2. Principe de fonctionnement : Comment ça marche ?
+3. Applications : À quoi ça sert ?
+4. Exemples concrets
+5. Lien avec les cours AMU : Mentionne explicitement les cours pertinents
+
+EXPLICATION:""")
+
+# Explication d'un sujet non couvert par les cours AMU
+TOPIC_PROMPT_TMPL = Template(SYSTEM_PREAMBLE + """SUJET À EXPLIQUER: $topic
+
+INSTRUCTIONS:
+$instructions
+
+Structure ta réponse ainsi:
+1. Définition : Qu'est-ce que c'est ?
+2. Principe de fonctionnement : Comment ça marche ?
+3. Applications : À quoi ça sert ?
+4. Exemples concrets
+
+Note: Ce sujet n'est pas directement couvert dans les cours AMU disponibles.
+
+EXPLICATION:""")
+
+# Réponse de l'assistant RAG, avec extraits des cours AMU
+ANSWER_WITH_CONTEXT_PROMPT_TMPL = Template(SYSTEM_PREAMBLE + """CONTEXTE (extrait des cours AMU) :
+$context
+
+QUESTION DE L'ÉTUDIANT :
+$question
+
+INSTRUCTIONS :
+1. Réponds de manière claire, pédagogique et structurée
+2. Utilise les informations du contexte fourni
+3. Cite explicitement les cours utilisés (ex: "Selon le cours de Machine Learning M1...")
+4. Si le contexte ne suffit pas, indique-le et donne quand même une réponse générale
+5. Utilise des exemples concrets si possible
+6. Structure ta réponse avec des sections claires
+
+RÉPONSE :""")
+
+# Réponse de l'assistant RAG sans document de référence
+ANSWER_PROMPT_TMPL = Template(SYSTEM_PREAMBLE + """Question : $question
+
+Réponds de manière claire et pédagogique, même sans documents de référence disponibles.""")
+
+# Quiz QCM généré à partir d'un document uploadé
+QUIZ_PROMPT_TMPL = Template("""Génère $num_questions questions à choix multiples basées sur ce contenu.
+Difficulté: $difficulty
+
+CONTENU:
+$text
+
+Format JSON strict (sans texte supplémentaire):
+[
+  {
+    "question": "Question claire et précise",
+    "options": ["Option A", "Option B", "Option C", "Option D"],
+    "correct_answer": "Option correcte",
+    "explanation": "Explication détaillée",
+    "difficulty": "$difficulty"
+  }
+]""")
@@ -0,0 +1,151 @@
+"""
+Cache persistant des réponses Gemini, adressé par le contenu des documents.
+Évite de repayer les appels LLM pour un document déjà analysé.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson optionnel : module json standard sinon
+    orjson = None
+
+
+class ResponseCache:
+    """Cache SQLite des analyses Gemini, indexé par hash SHA-256."""
+
+    def __init__(
+        self,
+        db_path: str = 'database/response_cache.db',
+        ttl_seconds: int = 7 * 24 * 3600,
+        prune_interval_seconds: int = 3600
+    ):
+        """
+        Initialise le cache de réponses.
+
+        Args:
+            db_path: Chemin vers la base SQLite du cache
+            ttl_seconds: Durée de vie d'une entrée (en secondes)
+            prune_interval_seconds: Intervalle entre deux purges des entrées expirées
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.prune_interval_seconds = prune_interval_seconds
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._init_database()
+
+        # Purge périodique des entrées expirées en arrière-plan
+        self._stop_event = threading.Event()
+        self._pruner = threading.Thread(target=self._prune_loop, daemon=True)
+        self._pruner.start()
+
+    def _init_database(self):
+        """Crée la table du cache si nécessaire."""
+        with self._lock, self._conn:
+            self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS response_cache (
+                cache_key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            ''')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_response_cache_expires '
+                'ON response_cache(expires_at)'
+            )
+
+    @staticmethod
+    def make_key(model_name: str, prompt_version: str, text: str) -> str:
+        """
+        Calcule la clé de cache d'un document.
+
+        Args:
+            model_name: Nom du modèle Gemini utilisé
+            prompt_version: Version des templates de prompts
+            text: Texte extrait du document
+
+        Returns:
+            Hash SHA-256 hexadécimal
+        """
+        return hashlib.sha256(
+            (model_name + prompt_version + text).encode('utf-8')
+        ).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Récupère une entrée non expirée du cache.
+
+        Args:
+            key: Clé de cache
+
+        Returns:
+            Données mises en cache ou None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT payload FROM response_cache WHERE cache_key = ? AND expires_at > ?',
+                (key, time.time())
+            ).fetchone()
+
+        if not row:
+            return None
+
+        return orjson.loads(row[0]) if orjson else json.loads(row[0])
+
+    def set(self, key: str, value: Dict):
+        """
+        Enregistre une entrée dans le cache (une seule transaction).
+
+        Args:
+            key: Clé de cache
+            value: Données sérialisables en JSON
+        """
+        now = time.time()
+        if orjson:
+            payload = orjson.dumps(value).decode()
+        else:
+            payload = json.dumps(value, ensure_ascii=False)
+
+        with self._lock, self._conn:
+            self._conn.execute('''
+            INSERT OR REPLACE INTO response_cache (cache_key, payload, created_at, expires_at)
+            VALUES (?, ?, ?, ?)
+            ''', (key, payload, now, now + self.ttl_seconds))
+
+    def prune(self) -> int:
+        """
+        Supprime les entrées expirées.
+
+        Returns:
+            Nombre d'entrées supprimées
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'DELETE FROM response_cache WHERE expires_at <= ?',
+                (time.time(),)
+            )
+            return cursor.rowcount
+
+    def _prune_loop(self):
+        """Boucle de purge exécutée dans un thread démon."""
+        while not self._stop_event.wait(self.prune_interval_seconds):
+            try:
+                removed = self.prune()
+                if removed:
+                    print(f"{removed} entrées expirées supprimées du cache de réponses")
+            except Exception as e:
+                print(f"Erreur purge du cache de réponses : {e}")
+
+    def close(self):
+        """Arrête la purge et ferme la connexion."""
+        self._stop_event.set()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,259 @@
+"""
+Cache sémantique des réponses de l'assistant Gemini.
+Deux questions paraphrasées (similarité cosinus au-dessus d'un seuil)
+partagent la même réponse au lieu de relancer recherche + génération.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson optionnel : module json standard sinon
+    orjson = None
+
+
+class _ScopeIndex:
+    """
+    Embeddings d'un scope dans une matrice préallouée, agrandie par
+    doublement (pas de copie complète à chaque insertion).
+    """
+
+    def __init__(self, dim: int, capacity: int = 16):
+        self.matrix = np.empty((capacity, dim), dtype=np.float32)
+        self.created = np.empty(capacity, dtype=np.float64)
+        self.last_used = np.empty(capacity, dtype=np.float64)
+        self.ids: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def append(self, entry_id: int, vector: np.ndarray, created_at: float):
+        """Ajoute une entrée en fin de matrice."""
+        size = len(self.ids)
+        if size == len(self.matrix):
+            capacity = max(16, size * 2)
+            self.matrix = self._grow(self.matrix, (capacity, self.matrix.shape[1]))
+            self.created = self._grow(self.created, (capacity,))
+            self.last_used = self._grow(self.last_used, (capacity,))
+
+        self.matrix[size] = vector
+        self.created[size] = created_at
+        self.last_used[size] = created_at
+        self.ids.append(entry_id)
+
+    @staticmethod
+    def _grow(array: np.ndarray, shape) -> np.ndarray:
+        grown = np.empty(shape, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    def remove(self, position: int) -> int:
+        """
+        Retire une entrée en y déplaçant la dernière ligne (O(dim)).
+
+        Returns:
+            entry_id de l'entrée retirée
+        """
+        last = len(self.ids) - 1
+        entry_id = self.ids[position]
+        if position != last:
+            self.matrix[position] = self.matrix[last]
+            self.created[position] = self.created[last]
+            self.last_used[position] = self.last_used[last]
+            self.ids[position] = self.ids[last]
+        self.ids.pop()
+        return entry_id
+
+
+class SemanticCache:
+    """Cache de réponses indexé par l'embedding des questions."""
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], np.ndarray],
+        db_path: str = 'database/semantic_cache.db',
+        threshold: float = 0.95,
+        max_entries: int = 1000,
+        ttl_seconds: Optional[float] = 7 * 24 * 3600
+    ):
+        """
+        Initialise le cache sémantique.
+
+        Args:
+            embed_fn: Fonction retournant l'embedding normalisé d'un texte
+            db_path: Chemin vers la base SQLite du cache
+            threshold: Similarité cosinus minimale pour réutiliser une réponse
+            max_entries: Nombre maximal de réponses par scope (éviction LRU)
+            ttl_seconds: Durée de vie d'une réponse (None = illimitée)
+        """
+        self.embed_fn = embed_fn
+        self.db_path = db_path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+
+        # Index en mémoire : scope -> _ScopeIndex
+        self._index: Dict[str, _ScopeIndex] = {}
+
+        self._init_database()
+        self._load_index()
+
+    def _init_database(self):
+        """Crée la table du cache si nécessaire."""
+        with self._lock, self._conn:
+            self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS semantic_cache (
+                entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                scope TEXT NOT NULL,
+                question TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            ''')
+
+    def _load_index(self):
+        """Charge les embeddings persistés dans l'index en mémoire."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT entry_id, scope, embedding, created_at FROM semantic_cache ORDER BY entry_id'
+            ).fetchall()
+
+            index = {}
+            for entry_id, scope, blob, created_at in rows:
+                vector = np.frombuffer(blob, dtype=np.float32)
+                scope_index = index.get(scope)
+                if scope_index is None:
+                    scope_index = index[scope] = _ScopeIndex(len(vector))
+                scope_index.append(entry_id, vector, created_at)
+
+            self._index = index
+            for scope_index in index.values():
+                self._evict(scope_index, time.time())
+
+        loaded = sum(len(scope_index) for scope_index in self._index.values())
+        if loaded:
+            print(f"{loaded} réponses chargées dans le cache sémantique")
+
+    def _evict(self, scope_index: _ScopeIndex, now: float, reserve: int = 0):
+        """
+        Retire les entrées expirées puis les moins récemment utilisées
+        au-delà de max_entries (appelé sous self._lock).
+
+        Args:
+            scope_index: Index du scope à purger
+            now: Horodatage courant
+            reserve: Places à libérer pour des insertions à venir
+        """
+        removed = []
+
+        if self.ttl_seconds is not None:
+            size = len(scope_index)
+            expired = np.flatnonzero(scope_index.created[:size] < now - self.ttl_seconds)
+            # Du plus grand au plus petit : remove() déplace la dernière ligne
+            for position in expired[::-1]:
+                removed.append(scope_index.remove(int(position)))
+
+        while len(scope_index) and len(scope_index) + reserve > self.max_entries:
+            position = int(np.argmin(scope_index.last_used[:len(scope_index)]))
+            removed.append(scope_index.remove(position))
+
+        if removed:
+            with self._conn:
+                self._conn.executemany(
+                    'DELETE FROM semantic_cache WHERE entry_id = ?',
+                    [(entry_id,) for entry_id in removed]
+                )
+
+    def _embed(self, text: str) -> np.ndarray:
+        """Calcule l'embedding normalisé (float32) d'un texte."""
+        vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def get(self, question: str, scope: str = '') -> Optional[Dict]:
+        """
+        Cherche une réponse à une question similaire.
+
+        Args:
+            question: Question de l'utilisateur
+            scope: Contexte de la question (niveau, options...)
+
+        Returns:
+            Réponse mise en cache ou None
+        """
+        vector = self._embed(question)
+
+        with self._lock:
+            scope_index = self._index.get(scope)
+            if not scope_index:
+                return None
+
+            size = len(scope_index)
+            similarities = scope_index.matrix[:size] @ vector
+            now = time.time()
+            if self.ttl_seconds is not None:
+                similarities[scope_index.created[:size] < now - self.ttl_seconds] = -np.inf
+            best = int(np.argmax(similarities))
+
+            if similarities[best] < self.threshold:
+                return None
+
+            scope_index.last_used[best] = now
+            row = self._conn.execute(
+                'SELECT payload FROM semantic_cache WHERE entry_id = ?',
+                (scope_index.ids[best],)
+            ).fetchone()
+
+        if not row:
+            return None
+
+        return orjson.loads(row[0]) if orjson else json.loads(row[0])
+
+    def set(self, question: str, payload: Dict, scope: str = ''):
+        """
+        Enregistre la réponse à une question.
+
+        Args:
+            question: Question de l'utilisateur
+            payload: Réponse sérialisable en JSON
+            scope: Contexte de la question (niveau, options...)
+        """
+        vector = self._embed(question)
+        now = time.time()
+
+        with self._lock:
+            scope_index = self._index.get(scope)
+            if scope_index is None:
+                scope_index = self._index[scope] = _ScopeIndex(len(vector))
+            self._evict(scope_index, now, reserve=1)
+
+            with self._conn:
+                cursor = self._conn.execute('''
+                INSERT INTO semantic_cache (scope, question, embedding, payload, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                ''', (
+                    scope,
+                    question,
+                    vector.tobytes(),
+                    orjson.dumps(payload).decode() if orjson else json.dumps(payload, ensure_ascii=False),
+                    now
+                ))
+
+            scope_index.append(cursor.lastrowid, vector, now)
+
+    def clear(self):
+        """Vide le cache (à appeler après une réindexation des cours)."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute('DELETE FROM semantic_cache')
+            self._index = {}
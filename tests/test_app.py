@@ -0,0 +1,204 @@
+"""
+Tests des routes Flask de app.py avec le client de test.
+
+app.py est importé dans un dossier de travail temporaire (bases SQLite,
+uploads, podcasts), sans clé Gemini ni préchauffage. Les tests sont
+ignorés si une dépendance de l'application n'est pas installée.
+"""
+
+import importlib
+import io
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+
+app_module = None
+_tmp = None
+_cwd = None
+
+
+def setUpModule():
+    global app_module, _tmp, _cwd
+
+    _cwd = os.getcwd()
+    _tmp = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+    os.chdir(_tmp.name)
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+    env = {
+        'GOOGLE_API_KEY': '',
+        'GEMINI_WARMUP': '0',
+        'SOCKETIO_ASYNC_MODE': 'threading',
+        'COURSE_MATERIALS_PATH': os.path.join(_tmp.name, 'course_materials'),
+    }
+    try:
+        with mock.patch.dict(os.environ, env):
+            app_module = importlib.import_module('app')
+    except ImportError as e:
+        tearDownModule()
+        raise unittest.SkipTest(f"dépendance de app.py manquante : {e}")
+
+    if app_module.course_indexer is None or app_module.db_pool is None:
+        tearDownModule()
+        raise unittest.SkipTest("CourseIndexer ou ConnectionPool non initialisé")
+
+
+def tearDownModule():
+    if _cwd is not None:
+        os.chdir(_cwd)
+    if _tmp is not None:
+        _tmp.cleanup()
+
+
+def insert_document(doc_id, file_path, filename, level='M1', category='ml'):
+    """Ajoute un document dans la base des cours (sans passer par l'indexeur)."""
+    with app_module.db_pool.transaction() as conn:
+        conn.execute('''
+        INSERT OR REPLACE INTO documents
+            (doc_id, file_path, level, category, filename, page_count, extracted_title)
+        VALUES (?, ?, ?, ?, ?, 1, ?)
+        ''', (doc_id, file_path, level, category, filename, filename))
+
+
+class AppTestCase(unittest.TestCase):
+    """Client de test de l'application."""
+
+    def setUp(self):
+        self.client = app_module.app.test_client()
+
+
+class DownloadCourseTest(AppTestCase):
+    """/api/courses/<doc_id>/download, avec ou sans pool de connexions."""
+
+    def setUp(self):
+        super().setUp()
+        self.pdf = Path('download_test.pdf').resolve()
+        self.pdf.write_bytes(b'%PDF-1.4 cours')
+        insert_document('doc-download', os.fspath(self.pdf), self.pdf.name)
+
+    def test_download_with_pool(self):
+        response = self.client.get('/api/courses/doc-download/download')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/pdf')
+        self.assertEqual(response.get_data(), b'%PDF-1.4 cours')
+        response.close()
+
+    def test_download_falls_back_without_pool(self):
+        with mock.patch.object(app_module, 'db_pool', None):
+            response = self.client.get('/api/courses/doc-download/download')
+            missing = self.client.get('/api/courses/inconnu/download')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(), b'%PDF-1.4 cours')
+        response.close()
+        self.assertEqual(missing.status_code, 404)
+
+
+class UploadTest(AppTestCase):
+    """/api/upload : réponse 202 immédiate puis état du job d'extraction."""
+
+    def wait_for_job(self, status_url):
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            job = self.client.get(status_url).get_json()
+            if job['status'] in ('done', 'error'):
+                return job
+            time.sleep(0.05)
+        self.fail(f"job non terminé : {job}")
+
+    def test_upload_returns_202_and_job_status(self):
+        # Extraction simulée : seul le cheminement du job est testé ici
+        processor = mock.Mock()
+        processor.process_document.return_value = 'Cours de probabilités. ' * 40
+
+        with mock.patch.object(app_module, 'document_processor', processor):
+            response = self.client.post(
+                '/api/upload',
+                data={'file': (io.BytesIO(b'%PDF-1.4 probabilites'), 'notes.pdf')},
+                content_type='multipart/form-data'
+            )
+
+            self.assertEqual(response.status_code, 202)
+            body = response.get_json()
+            self.assertTrue(body['success'])
+            self.assertEqual(body['filename'], 'notes.pdf')
+            self.assertEqual(body['status_url'], f"/api/upload/status/{body['job_id']}")
+
+            job = self.wait_for_job(body['status_url'])
+
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['result']['file_id'], body['file_id'])
+        self.assertTrue(job['result']['text_preview'].startswith('Cours de probabilités.'))
+        self.assertEqual(job['result']['text_length'], len('Cours de probabilités. ' * 40))
+
+        # Le fichier garde son propre nom sur le disque
+        upload_path = app_module.find_upload_path(body['file_id'])
+        self.assertEqual(upload_path.name, f"{body['file_id']}_notes.pdf")
+
+    def test_unknown_job_is_404(self):
+        self.assertEqual(self.client.get('/api/upload/status/inconnu').status_code, 404)
+
+    def test_rejects_disallowed_extension(self):
+        response = self.client.post(
+            '/api/upload',
+            data={'file': (io.BytesIO(b'MZ'), 'programme.exe')},
+            content_type='multipart/form-data'
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+class CoursesEtagTest(AppTestCase):
+    """/api/courses : liste streamée, ETag et 304."""
+
+    def test_etag_and_not_modified(self):
+        insert_document('doc-etag-a', '/cours/a.pdf', 'a.pdf', level='M1')
+        insert_document('doc-etag-b', '/cours/b.pdf', 'b.pdf', level='M2')
+
+        response = self.client.get('/api/courses')
+        self.assertEqual(response.status_code, 200)
+        etag, _ = response.get_etag()
+        self.assertTrue(etag)
+        body = response.get_json()
+        self.assertEqual(body['total_courses'], len(body['courses']))
+        self.assertIn('doc-etag-a', [course['doc_id'] for course in body['courses']])
+
+        cached = self.client.get('/api/courses', headers={'If-None-Match': f'"{etag}"'})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.get_data(), b'')
+
+        # Un nouveau document change l'ETag : la liste est renvoyée
+        insert_document('doc-etag-c', '/cours/c.pdf', 'c.pdf')
+        changed = self.client.get('/api/courses', headers={'If-None-Match': f'"{etag}"'})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.get_etag()[0], etag)
+
+
+class CourseDetailsTest(AppTestCase):
+    """/api/courses/<doc_id> : détails en cache, cours inconnus non mis en cache."""
+
+    def test_missing_course_is_not_cached(self):
+        cached_before = app_module.load_course_details.cache_info().currsize
+
+        self.assertEqual(self.client.get('/api/courses/doc-late').status_code, 404)
+        self.assertEqual(app_module.load_course_details.cache_info().currsize, cached_before)
+
+        # Indexé après coup : trouvé sans attendre une réindexation
+        insert_document('doc-late', '/cours/late.pdf', 'late.pdf')
+        response = self.client.get('/api/courses/doc-late')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['course']['doc_id'], 'doc-late')
+        self.assertEqual(app_module.load_course_details.cache_info().currsize, cached_before + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""Tests du pool de connexions SQLite (src/db_pool.py)."""
+
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.db_pool import ConnectionPool, read_connection
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    """Isolation lecture / écriture et transactions du pool."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self._tmp.name) / 'test.db')
+        self.pool = ConnectionPool(self.db_path, readers=2)
+        with self.pool.transaction() as conn:
+            conn.execute('CREATE TABLE items (name TEXT)')
+
+    def tearDown(self):
+        self.pool.close()
+        self._tmp.cleanup()
+
+    def count(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+
+    def test_reader_is_read_only(self):
+        with self.pool.connection() as conn:
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO items VALUES ('x')")
+
+    def test_reader_does_not_see_uncommitted_writes(self):
+        with self.pool.transaction() as writer:
+            writer.execute("INSERT INTO items VALUES ('a')")
+            self.assertEqual(self.count(), 0)
+
+        self.assertEqual(self.count(), 1)
+
+    def test_transaction_rolls_back_on_exception(self):
+        with self.assertRaises(RuntimeError):
+            with self.pool.transaction() as conn:
+                conn.execute("INSERT INTO items VALUES ('a')")
+                raise RuntimeError('échec')
+
+        self.assertEqual(self.count(), 0)
+
+        # La connexion en écriture reste utilisable après le ROLLBACK
+        with self.pool.transaction() as conn:
+            conn.execute("INSERT INTO items VALUES ('b')")
+        self.assertEqual(self.count(), 1)
+
+    def test_readers_are_reused(self):
+        with self.pool.connection() as conn:
+            first = conn
+        with self.pool.connection() as conn:
+            self.assertIs(conn, first)
+
+    def test_read_connection_without_pool(self):
+        with self.pool.transaction() as conn:
+            conn.execute("INSERT INTO items VALUES ('a')")
+
+        with read_connection(self.db_path) as conn:
+            self.assertEqual(conn.execute('SELECT name FROM items').fetchall(), [('a',)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+"""Tests de la file de tâches en arrière-plan (src/job_queue.py)."""
+
+import threading
+import time
+import unittest
+
+from src.job_queue import BackgroundJobManager
+
+
+class BackgroundJobManagerTest(unittest.TestCase):
+    """Transitions d'état et abonnements à la progression."""
+
+    def setUp(self):
+        self.jobs = BackgroundJobManager(max_workers=1)
+
+    def tearDown(self):
+        self.jobs.shutdown()
+
+    def wait_done(self, job_id: str) -> dict:
+        """Attend la fin d'un job via ses évènements et retourne son état."""
+        events = self.jobs.subscribe(job_id)
+        while events.get(timeout=5)['stage'] not in ('done', 'error'):
+            pass
+        self.jobs.unsubscribe(job_id, events)
+        return self.jobs.get(job_id)
+
+    def test_status_transitions(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def work():
+            started.set()
+            release.wait(5)
+            return {'value': 42}
+
+        # Le seul worker est occupé : le second job reste en file
+        first = self.jobs.submit(work)
+        second = self.jobs.submit(lambda: 'ok')
+        self.assertTrue(started.wait(5))
+        self.assertEqual(self.jobs.get(first)['status'], 'running')
+        self.assertEqual(self.jobs.get(second)['status'], 'queued')
+
+        release.set()
+        job = self.wait_done(first)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['result'], {'value': 42})
+        self.assertIsNotNone(job['finished_at'])
+        self.assertEqual(self.wait_done(second)['result'], 'ok')
+
+    def test_error_status(self):
+        def fail():
+            raise ValueError('Document trop court ou vide')
+
+        job = self.wait_done(self.jobs.submit(fail))
+
+        self.assertEqual(job['status'], 'error')
+        self.assertEqual(job['error'], 'Document trop court ou vide')
+        self.assertIsNone(job['result'])
+
+    def test_on_done_receives_final_state(self):
+        finished = []
+        notified = threading.Event()
+
+        def on_done(job):
+            finished.append(job)
+            notified.set()
+
+        job_id = self.jobs.submit(lambda: 'ok', on_done=on_done)
+
+        self.assertTrue(notified.wait(5))
+        self.assertEqual(finished[0]['job_id'], job_id)
+        self.assertEqual(finished[0]['status'], 'done')
+
+    def test_progress_events_reach_subscribers(self):
+        release = threading.Event()
+
+        def work(progress):
+            release.wait(5)
+            progress('extract', 10)
+            progress('tts', 80)
+            return 'ok'
+
+        job_id = self.jobs.submit(work, with_progress=True)
+        events = self.jobs.subscribe(job_id)
+        release.set()
+
+        stages = []
+        while not stages or stages[-1] not in ('done', 'error'):
+            stages.append(events.get(timeout=5)['stage'])
+
+        self.assertIn('extract', stages)
+        self.assertEqual(stages[-2:], ['tts', 'done'])
+        self.assertEqual(self.jobs.get(job_id)['progress'], {'stage': 'tts', 'pct': 80})
+
+    def test_unsubscribe_stops_events(self):
+        release = threading.Event()
+
+        def work(progress):
+            release.wait(5)
+            progress('extract', 10)
+            return 'ok'
+
+        job_id = self.jobs.submit(work, with_progress=True)
+        events = self.jobs.subscribe(job_id)
+        events.get(timeout=5)  # état courant
+        self.jobs.unsubscribe(job_id, events)
+        self.assertNotIn(job_id, self.jobs._subscribers)
+
+        release.set()
+        self.wait_done(job_id)
+        self.assertTrue(events.empty())
+
+    def test_subscribe_after_completion_gets_final_event(self):
+        job_id = self.jobs.submit(lambda: 'ok')
+        self.wait_done(job_id)
+
+        events = self.jobs.subscribe(job_id)
+        self.assertEqual(events.get(timeout=5), {'stage': 'done', 'pct': 100, 'error': None})
+        self.assertIsNone(self.jobs.subscribe('inconnu'))
+
+    def test_on_done_errors_are_logged(self):
+        notified = threading.Event()
+
+        def on_done(job):
+            notified.set()
+            raise RuntimeError('client parti')
+
+        with self.assertLogs('amu_app.jobs', level='ERROR') as logs:
+            job_id = self.jobs.submit(lambda: 'ok', on_done=on_done)
+            self.assertTrue(notified.wait(5))
+            self.jobs.shutdown()
+
+        self.assertIn(job_id, logs.output[0])
+        self.assertEqual(self.jobs.get(job_id)['status'], 'done')
+
+
+class BackgroundJobManagerPruneTest(unittest.TestCase):
+    """Oubli des jobs terminés et de leurs abonnés."""
+
+    def test_prune_drops_leftover_subscribers(self):
+        jobs = BackgroundJobManager(max_workers=1, ttl_seconds=0)
+        self.addCleanup(jobs.shutdown)
+        release = threading.Event()
+        finished = threading.Event()
+
+        job_id = jobs.submit(release.wait, 5, on_done=lambda job: finished.set())
+        jobs.subscribe(job_id)  # Abonné qui ne se désabonne jamais
+        release.set()
+        self.assertTrue(finished.wait(5))
+        self.assertIn(job_id, jobs._subscribers)
+
+        # Toute soumission purge les jobs expirés
+        time.sleep(0.01)
+        jobs.submit(lambda: None)
+
+        self.assertIsNone(jobs.get(job_id))
+        self.assertNotIn(job_id, jobs._subscribers)
+
+
+if __name__ == '__main__':
+    unittest.main()
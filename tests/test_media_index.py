@@ -0,0 +1,46 @@
+"""Tests de l'index des médias (src/media_index.py)."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.media_index import MediaIndex
+
+
+class MediaIndexTest(unittest.TestCase):
+    """Chemins, texte extrait partagé par SHA-256 et métadonnées."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.index = MediaIndex(db_path=str(Path(self._tmp.name) / 'media.db'))
+
+    def tearDown(self):
+        self.index._conn.close()
+        self._tmp.cleanup()
+
+    def test_same_content_keeps_separate_upload_paths(self):
+        self.index.register_upload('first', 'uploads/first_cours.pdf', sha256='abc')
+        self.index.register_upload('second', 'uploads/second_copie.pdf', sha256='abc')
+
+        # Chaque upload garde son fichier ; seul le SHA-256 est commun
+        self.assertEqual(self.index.get_upload_path('first'), 'uploads/first_cours.pdf')
+        self.assertEqual(self.index.get_upload_path('second'), 'uploads/second_copie.pdf')
+        self.assertEqual(self.index.get_sha256('first'), self.index.get_sha256('second'))
+
+    def test_extracted_text_is_shared_by_content(self):
+        self.index.set_extracted_text('abc', {'text': 'contenu', 'pages': 2})
+
+        self.assertEqual(self.index.get_extracted_text('abc'), {'text': 'contenu', 'pages': 2})
+        self.assertIsNone(self.index.get_extracted_text('def'))
+
+    def test_metadata_roundtrip(self):
+        self.index.set_audio_path('file', 'audio/file.mp3')
+        self.index.set_metadata('file', {'title': 'Épisode', 'duration': 120})
+
+        self.assertEqual(self.index.get_audio_path('file'), 'audio/file.mp3')
+        self.assertEqual(self.index.get_metadata('file'), {'title': 'Épisode', 'duration': 120})
+        self.assertIsNone(self.index.get_metadata('inconnu'))
+
+
+if __name__ == '__main__':
+    unittest.main()
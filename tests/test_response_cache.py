@@ -0,0 +1,57 @@
+"""Tests du cache des réponses Gemini (src/response_cache.py)."""
+
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.response_cache import ResponseCache
+
+
+class ResponseCacheTest(unittest.TestCase):
+    """Lecture, écriture et expiration des entrées."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(
+            db_path=str(Path(self._tmp.name) / 'cache.db'),
+            ttl_seconds=60
+        )
+
+    def tearDown(self):
+        self.cache.close()
+        self._tmp.cleanup()
+
+    def test_roundtrip(self):
+        key = ResponseCache.make_key('model', 'v1', 'texte')
+        self.cache.set(key, {'summary': 'résumé', 'keywords': ['a', 'b']})
+
+        self.assertEqual(self.cache.get(key), {'summary': 'résumé', 'keywords': ['a', 'b']})
+        self.assertIsNone(self.cache.get('inconnue'))
+
+    def test_key_depends_on_model_and_prompt_version(self):
+        key = ResponseCache.make_key('model', 'v1', 'texte')
+
+        self.assertNotEqual(key, ResponseCache.make_key('model', 'v2', 'texte'))
+        self.assertNotEqual(key, ResponseCache.make_key('other', 'v1', 'texte'))
+
+    def test_entry_expires_after_ttl(self):
+        self.cache.set('key', {'value': 1})
+        later = time.time() + 61
+
+        with mock.patch('src.response_cache.time.time', return_value=later):
+            self.assertIsNone(self.cache.get('key'))
+            self.assertEqual(self.cache.prune(), 1)
+
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_prune_keeps_live_entries(self):
+        self.cache.set('key', {'value': 1})
+
+        self.assertEqual(self.cache.prune(), 0)
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""Tests du cache sémantique (src/semantic_cache.py)."""
+
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if np is not None:
+    from src.semantic_cache import SemanticCache
+
+
+# Embeddings factices : les paraphrases ont presque le même vecteur
+VECTORS = {
+    'qu est-ce qu une matrice': [1.0, 0.0, 0.0],
+    'c est quoi une matrice': [0.99, 0.05, 0.0],
+    'qu est-ce qu un graphe': [0.0, 1.0, 0.0],
+    'qu est-ce qu un arbre': [0.0, 0.0, 1.0],
+}
+
+
+@unittest.skipIf(np is None, 'numpy non installé')
+class SemanticCacheTest(unittest.TestCase):
+    """Seuil de similarité, scopes, éviction LRU et expiration."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self._tmp.name) / 'semantic.db')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def make_cache(self, **kwargs) -> 'SemanticCache':
+        cache = SemanticCache(
+            embed_fn=lambda text: np.array(VECTORS[text], dtype=np.float32),
+            db_path=self.db_path,
+            **kwargs
+        )
+        self.addCleanup(cache._conn.close)
+        return cache
+
+    def test_paraphrase_hits_above_threshold(self):
+        cache = self.make_cache(threshold=0.95)
+        cache.set('qu est-ce qu une matrice', {'answer': 'A'}, scope='L1')
+
+        self.assertEqual(cache.get('c est quoi une matrice', scope='L1'), {'answer': 'A'})
+        self.assertIsNone(cache.get('qu est-ce qu un graphe', scope='L1'))
+
+    def test_scopes_are_isolated(self):
+        cache = self.make_cache()
+        cache.set('qu est-ce qu une matrice', {'answer': 'L1'}, scope='L1')
+        cache.set('qu est-ce qu une matrice', {'answer': 'M2'}, scope='M2')
+
+        self.assertEqual(cache.get('qu est-ce qu une matrice', scope='L1'), {'answer': 'L1'})
+        self.assertEqual(cache.get('qu est-ce qu une matrice', scope='M2'), {'answer': 'M2'})
+        self.assertIsNone(cache.get('qu est-ce qu une matrice', scope='L3'))
+
+    def test_index_is_reloaded_from_disk(self):
+        self.make_cache().set('qu est-ce qu un graphe', {'answer': 'G'}, scope='L1')
+
+        self.assertEqual(self.make_cache().get('qu est-ce qu un graphe', scope='L1'), {'answer': 'G'})
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = self.make_cache(max_entries=2)
+        cache.set('qu est-ce qu une matrice', {'answer': 'A'})
+        cache.set('qu est-ce qu un graphe', {'answer': 'G'})
+        cache.get('qu est-ce qu une matrice')
+        cache.set('qu est-ce qu un arbre', {'answer': 'T'})
+
+        self.assertIsNone(cache.get('qu est-ce qu un graphe'))
+        self.assertEqual(cache.get('qu est-ce qu une matrice'), {'answer': 'A'})
+        self.assertEqual(cache.get('qu est-ce qu un arbre'), {'answer': 'T'})
+
+        rows = cache._conn.execute('SELECT COUNT(*) FROM semantic_cache').fetchone()[0]
+        self.assertEqual(rows, 2)
+
+    def test_expired_entries_are_ignored(self):
+        cache = self.make_cache(ttl_seconds=60)
+        cache.set('qu est-ce qu une matrice', {'answer': 'A'})
+        later = time.time() + 61
+
+        with mock.patch('src.semantic_cache.time.time', return_value=later):
+            self.assertIsNone(cache.get('qu est-ce qu une matrice'))
+
+    def test_matrix_grows_past_initial_capacity(self):
+        cache = self.make_cache(max_entries=100)
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(40, 3)).astype(np.float32)
+        with mock.patch.object(cache, '_embed', side_effect=list(vectors)):
+            for i in range(40):
+                cache.set(f'question {i}', {'answer': i})
+
+        self.assertEqual(len(cache._index['']), 40)
+
+
+if __name__ == '__main__':
+    unittest.main()